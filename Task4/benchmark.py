@@ -0,0 +1,59 @@
+"""
+Benchmark metrics shared by the model-variant scripts (quantization, distillation).
+
+Same data and metrics as Task5/Eval_benchmark.ipynb: the labelled
+benchmark dataset, scored with the relevance score (softmax probability of class 1).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+from inference import score_texts
+from ranking_metrics import ranking_metrics
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import dataset_path, read_table  # noqa: E402
+
+BENCHMARK_PATH = dataset_path("benchmark")
+GUARD_METRICS = ["f1", "map", "ndcg", "r_precision"]
+# a variant may lose at most this much on every guarded metric
+MAX_METRIC_DROP = 0.01
+
+
+def load_benchmark(path=BENCHMARK_PATH):
+    """(texts, labels) of the benchmark, dropping rows without abstract or label."""
+    df = read_table(path, columns=["abstract", "label"]).dropna(subset=["abstract", "label"])
+    return df["abstract"].astype(str).tolist(), df["label"].astype(int).to_numpy()
+
+
+def benchmark_metrics(labels, scores, threshold=0.5):
+    """F1 at `threshold` plus the ranking metrics of the eval notebook."""
+    labels = np.asarray(labels)
+    scores = np.asarray(scores)
+    ranking = ranking_metrics(labels, scores, ks=())
+    return {
+        "f1": float(f1_score(labels, scores >= threshold, zero_division=0)),
+        "map": ranking["map"],
+        "ndcg": ranking["ndcg"],
+        "r_precision": ranking["r_precision"],
+    }
+
+
+def evaluate_model(tokenizer, model, texts, labels, **kwargs):
+    """Score the benchmark with any inference backend and return its metrics."""
+    return benchmark_metrics(labels, score_texts(tokenizer, model, texts, **kwargs))
+
+
+def metric_regressions(reference, candidate, max_drop=MAX_METRIC_DROP, metrics=GUARD_METRICS):
+    """Guarded metrics where `candidate` is more than `max_drop` below `reference`."""
+    return {m: (reference[m], candidate[m]) for m in metrics if candidate[m] < reference[m] - max_drop}
+
+
+def print_metrics(rows):
+    """rows: {name: metrics dict}, printed as one line per model."""
+    names = list(next(iter(rows.values())).keys())
+    print(f"{'':<12}" + "".join(f"{n:>13}" for n in names))
+    for label, metrics in rows.items():
+        print(f"{label:<12}" + "".join(f"{metrics[n]:>13.4f}" for n in names))
@@ -0,0 +1,211 @@
+"""
+Two-stage cascade: a hashed n-gram linear prefilter in front of the BERT classifier.
+
+    python cascade.py train --target-recall 0.98       # fit on the train split, calibrate on validation
+    python cascade.py score pool.parquet scored.parquet
+
+Stage 1 is a logistic regression on hashed word 1-2 grams, trained on the
+split_data.py splits; it scores thousands of abstracts per second. Documents
+below the band's lower bound are rejected and documents above its upper bound
+accepted without running BERT; only the uncertain band in between is sent to
+the transformer. The upper bound is the lowest stage-1 score whose positives
+are at least --accept-precision precise on validation; the lower bound is the
+highest one that still keeps the cascade's validation recall at --target-recall.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from inference import (
+    BACKENDS, CHUNK_SIZE, MODEL_DIR, TableWriter, find_text_column, iter_table, load_model, score_texts,
+)
+from training import read_split
+
+PREFILTER_PATH = Path(__file__).resolve().parent / "prefilter.joblib"
+N_FEATURES = 2 ** 20
+TARGET_RECALL = 0.98
+ACCEPT_PRECISION = 0.995
+THRESHOLD = 0.5
+
+
+# ---------- Stage 1 ----------
+def make_vectorizer():
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), alternate_sign=False,
+                             lowercase=True, norm="l2")
+
+
+def clean_texts(texts):
+    return ["" if pd.isna(t) else str(t) for t in texts]
+
+
+def train_prefilter(texts, labels, C=4.0):
+    clf = LogisticRegression(C=C, max_iter=2000, class_weight="balanced")
+    clf.fit(make_vectorizer().transform(clean_texts(texts)), labels)
+    return clf
+
+
+def prefilter_scores(clf, texts):
+    return clf.predict_proba(make_vectorizer().transform(clean_texts(texts)))[:, 1]
+
+
+# ---------- Calibration ----------
+def accept_bound(labels, stage1, precision):
+    """Lowest stage-1 score above which validation positives are `precision` precise (above 1 = never)."""
+    order = np.argsort(-stage1, kind="stable")
+    hits = np.cumsum(labels[order])
+    prec = hits / np.arange(1, len(order) + 1)
+    ok = np.flatnonzero(prec >= precision)
+    if len(ok) == 0:
+        return 1.0 + 1e-9
+    # last prefix that is still precise enough, cut at a score boundary
+    bound = stage1[order[ok[-1]]]
+    return float(bound) if bound > 0 else 1.0 + 1e-9
+
+
+def reject_bound(labels, stage1, bert_positive, high, target_recall):
+    """Highest lower bound keeping cascade recall >= target_recall on validation."""
+    n_pos = labels.sum()
+    if n_pos == 0:
+        return 0.0
+    accepted = (stage1 >= high) & (labels == 1)
+    base = accepted.sum()
+    # positives recovered by BERT inside [low, high), added as low decreases
+    in_band = (stage1 < high) & (labels == 1) & bert_positive
+    order = np.argsort(-stage1, kind="stable")
+    recovered = base + np.cumsum(in_band[order])
+    reached = np.flatnonzero(recovered / n_pos >= target_recall)
+    if len(reached) == 0:
+        return 0.0
+    return float(stage1[order[reached[0]]])
+
+
+def calibrate_band(labels, stage1, bert_scores, target_recall=TARGET_RECALL,
+                   accept_precision=ACCEPT_PRECISION, threshold=THRESHOLD):
+    labels = np.asarray(labels)
+    # outside the band the stage-1 score is final, so the band must contain the threshold
+    high = max(accept_bound(labels, stage1, accept_precision), threshold)
+    low = reject_bound(labels, stage1, bert_scores >= threshold, high, target_recall)
+    return min(low, threshold), high
+
+
+# ---------- Cascade ----------
+def cascade_scores(prefilter, band, tokenizer, model, texts, **score_kwargs):
+    """
+    Final relevance scores and the escalated mask. Documents outside the band
+    keep their stage-1 score; documents inside it get the BERT score.
+    """
+    texts = clean_texts(texts)
+    low, high = band
+    scores = prefilter_scores(prefilter, texts)
+    escalated = (scores >= low) & (scores < high)
+    if escalated.any():
+        idx = np.flatnonzero(escalated)
+        scores[idx] = score_texts(tokenizer, model, [texts[i] for i in idx], **score_kwargs)
+    return scores, escalated
+
+
+def recall_precision(labels, predicted):
+    labels = np.asarray(labels).astype(bool)
+    tp = (labels & predicted).sum()
+    return tp / max(labels.sum(), 1), tp / max(predicted.sum(), 1)
+
+
+def evaluate(prefilter, band, tokenizer, model, texts, labels, threshold=THRESHOLD):
+    """Cascade vs BERT alone on labelled texts: recall, precision, escalated fraction, docs/s."""
+    start = time.perf_counter()
+    bert = score_texts(tokenizer, model, texts)
+    bert_time = time.perf_counter() - start
+    start = time.perf_counter()
+    cascade, escalated = cascade_scores(prefilter, band, tokenizer, model, texts)
+    cascade_time = time.perf_counter() - start
+
+    rows = {}
+    for name, scores, seconds in (("bert", bert, bert_time), ("cascade", cascade, cascade_time)):
+        recall, precision = recall_precision(labels, scores >= threshold)
+        rows[name] = {"recall": recall, "precision": precision, "docs_per_s": len(texts) / seconds}
+    rows["cascade"]["escalated"] = float(escalated.mean())
+    return rows
+
+
+def load_split(data_dir, name):
+    df = read_split(name, data_dir)
+    return df["text"].tolist(), df["label"].to_numpy()
+
+
+def train(args):
+    tokenizer, model = load_model(args.model, num_threads=args.threads, backend=args.backend)
+    train_texts, train_labels = load_split(args.data_dir, "train")
+    val_texts, val_labels = load_split(args.data_dir, "validation")
+    test_texts, test_labels = load_split(args.data_dir, "test")
+
+    prefilter = train_prefilter(train_texts, train_labels)
+    band = calibrate_band(val_labels, prefilter_scores(prefilter, val_texts),
+                          score_texts(tokenizer, model, val_texts), args.target_recall, args.accept_precision)
+    print(f"Band [{band[0]:.4f}, {band[1]:.4f}) for target recall {args.target_recall} on validation")
+
+    report = evaluate(prefilter, band, tokenizer, model, test_texts, test_labels)
+    for name, r in report.items():
+        extra = f", escalated {r['escalated']:.1%}" if "escalated" in r else ""
+        print(f"{name:<8} recall {r['recall']:.4f}, precision {r['precision']:.4f}, "
+              f"{r['docs_per_s']:.1f} docs/s{extra}")
+    joblib.dump({"prefilter": prefilter, "band": band, "target_recall": args.target_recall}, args.prefilter)
+    print(f"Saved prefilter -> {args.prefilter}")
+
+
+def score(args):
+    saved = joblib.load(args.prefilter)
+    tokenizer, model = load_model(args.model, num_threads=args.threads, backend=args.backend)
+    writer = TableWriter(args.output)
+    start, n_rows, n_escalated = time.perf_counter(), 0, 0
+    for chunk in iter_table(args.input, chunk_size=args.chunk_size):
+        column = find_text_column(chunk.columns, args.text_column)
+        chunk["relevance_score"], chunk["escalated"] = cascade_scores(
+            saved["prefilter"], saved["band"], tokenizer, model, chunk[column])
+        writer.write(chunk)
+        n_rows += len(chunk)
+        n_escalated += int(chunk["escalated"].sum())
+        print(f"Scored {n_rows} rows, {n_escalated / n_rows:.1%} escalated "
+              f"({n_rows / (time.perf_counter() - start):.1f} rows/s)")
+    writer.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hashed n-gram prefilter + BERT cascade.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    t = sub.add_parser("train", help="fit the prefilter, calibrate the band, report on the test split")
+    t.add_argument("--data-dir", default=".", help="directory with the train/validation/test_set splits")
+    t.add_argument("--target-recall", type=float, default=TARGET_RECALL)
+    t.add_argument("--accept-precision", type=float, default=ACCEPT_PRECISION,
+                   help="precision required to accept without BERT (above 1 disables)")
+
+    s = sub.add_parser("score", help="score a table through the cascade")
+    s.add_argument("input", help="input .csv, .xlsx or .parquet")
+    s.add_argument("output", help="output .csv, .xlsx or .parquet")
+    s.add_argument("--text-column", default=None)
+    s.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    for p in (t, s):
+        p.add_argument("--prefilter", default=str(PREFILTER_PATH), help="prefilter + band file")
+        p.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+        p.add_argument("--backend", choices=BACKENDS, default="torch")
+        p.add_argument("--threads", type=int, default=None, help="CPU threads")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "train":
+        train(args)
+    else:
+        score(args)
+
+
+if __name__ == "__main__":
+    main()
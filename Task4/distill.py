@@ -0,0 +1,237 @@
+"""
+Distil polyphenol_classifier_final into a small student for high-volume pre-screening.
+
+    python distill.py                                         # 4 layers, teacher width
+    python distill.py --pool ../data/pubmed_pool.parquet --layers 2 --hidden 384 --heads 6
+    python distill.py --random-teacher /tmp/tiny_teacher --data /tmp/sample.parquet --benchmark /tmp/bench.xlsx
+
+The teacher scores the master_dataset_pulito dataset plus an optional unlabelled
+pool once; the student is trained on its temperature-softened logits (KL)
+and, where a label exists, on the label too (cross-entropy). A student with
+the teacher's width starts from evenly spaced teacher layers, otherwise it
+is randomly initialized. The result is saved with save_pretrained, so
+Eval_benchmark.ipynb loads it like the teacher.
+
+--random-teacher first writes a tiny randomly initialized BERT classifier
+(with the local polyphenol_classifier_final tokenizer) and uses it as the
+teacher, so the whole pipeline can be smoke-tested without downloading weights.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from datasets import Dataset
+from transformers import (
+    AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, BertConfig, DataCollatorWithPadding, Trainer,
+)
+
+from benchmark import BENCHMARK_PATH, evaluate_model, load_benchmark, print_metrics
+from inference import MODEL_DIR, TorchClassifier, find_text_column, iter_table, predict_logits
+from training import MAX_LENGTH, make_training_args, tokenize_dataset
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import dataset_path, read_table  # noqa: E402
+
+MASTER_PATH = dataset_path("master_dataset_pulito")
+STUDENT_DIR = Path(__file__).resolve().parent / "polyphenol_student"
+STUDENT_LAYERS = 4
+TEMPERATURE = 2.0
+# weight of the soft (teacher) loss; 1 - ALPHA goes to the hard label loss
+ALPHA = 0.7
+EPOCHS = 3
+LEARNING_RATE = 5e-5
+UNLABELLED = -100
+
+
+# ---------- Data ----------
+def load_distillation_texts(master_path=MASTER_PATH, pool_path=None, pool_limit=None):
+    """DataFrame(text, label): labelled master dataset plus pool rows with label UNLABELLED."""
+    df = read_table(master_path, columns=["abstract", "label"]).dropna(subset=["abstract", "label"])
+    df = df.rename(columns={"abstract": "text"})
+    frames = [df.astype({"label": int})]
+    if pool_path:
+        texts = []
+        for chunk in iter_table(pool_path):
+            texts.extend(chunk[find_text_column(chunk.columns)].dropna().astype(str).tolist())
+            if pool_limit and len(texts) >= pool_limit:
+                break
+        pool = pd.DataFrame({"text": texts[:pool_limit] if pool_limit else texts, "label": UNLABELLED})
+        # pool abstracts already in the labelled data would only be counted twice
+        frames.append(pool[~pool["text"].isin(set(df["text"]))])
+    return pd.concat(frames, ignore_index=True)
+
+
+# ---------- Models ----------
+def make_random_teacher(output_dir, tokenizer_dir=MODEL_DIR, layers=2, hidden=32, heads=2, intermediate=64):
+    """Tiny randomly initialized BERT classifier in HF layout, for testing the pipeline offline."""
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+    config = BertConfig(vocab_size=len(tokenizer), hidden_size=hidden, num_hidden_layers=layers,
+                        num_attention_heads=heads, intermediate_size=intermediate, num_labels=2)
+    AutoModelForSequenceClassification.from_config(config).save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def student_config(teacher_config, layers=STUDENT_LAYERS, hidden=None, heads=None, intermediate=None):
+    """Teacher config with fewer layers and optionally a smaller width."""
+    config = AutoConfig.for_model(**teacher_config.to_dict())
+    config.num_hidden_layers = layers
+    if hidden:
+        config.hidden_size = hidden
+        config.num_attention_heads = heads or max(1, hidden // 64)
+        config.intermediate_size = intermediate or 4 * hidden
+    else:
+        config.num_attention_heads = heads or config.num_attention_heads
+        config.intermediate_size = intermediate or config.intermediate_size
+    return config
+
+
+def init_from_teacher(student, teacher):
+    """
+    Copy embeddings, pooler, head and evenly spaced encoder layers (BERT layout).
+    Only possible when the student kept the teacher's width; returns whether it copied.
+    """
+    s_cfg, t_cfg = student.config, teacher.config
+    if (s_cfg.hidden_size, s_cfg.num_attention_heads, s_cfg.intermediate_size) != \
+            (t_cfg.hidden_size, t_cfg.num_attention_heads, t_cfg.intermediate_size):
+        return False
+    s_base, t_base = student.base_model, teacher.base_model
+    s_base.embeddings.load_state_dict(t_base.embeddings.state_dict())
+    if getattr(s_base, "pooler", None) is not None and getattr(t_base, "pooler", None) is not None:
+        s_base.pooler.load_state_dict(t_base.pooler.state_dict())
+    student.classifier.load_state_dict(teacher.classifier.state_dict())
+    picked = np.linspace(0, t_cfg.num_hidden_layers - 1, s_cfg.num_hidden_layers).round().astype(int)
+    for s_layer, t_index in zip(s_base.encoder.layer, picked):
+        s_layer.load_state_dict(t_base.encoder.layer[int(t_index)].state_dict())
+    return True
+
+
+class DistillationTrainer(Trainer):
+    """Trainer whose loss is the soft-target KL plus cross-entropy on labelled rows."""
+
+    def __init__(self, *args, temperature=TEMPERATURE, alpha=ALPHA, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        teacher_logits = inputs.pop("teacher_logits")
+        labels = inputs.pop("labels", None)
+        outputs = model(**inputs)
+        t = self.temperature
+        soft = F.kl_div(F.log_softmax(outputs.logits / t, dim=-1), F.softmax(teacher_logits / t, dim=-1),
+                        reduction="batchmean") * t * t
+        loss = self.alpha * soft
+        if labels is not None and (labels != UNLABELLED).any():
+            hard = F.cross_entropy(outputs.logits, labels, ignore_index=UNLABELLED)
+            loss = loss + (1 - self.alpha) * hard
+        return (loss, outputs) if return_outputs else loss
+
+
+# ---------- Pipeline ----------
+def timed_benchmark(tokenizer, model, texts, labels):
+    start = time.perf_counter()
+    metrics = evaluate_model(tokenizer, TorchClassifier(model), texts, labels)
+    return metrics, time.perf_counter() - start
+
+
+def distill(teacher_dir=MODEL_DIR, output_dir=STUDENT_DIR, master_path=MASTER_PATH, pool_path=None,
+            pool_limit=None, benchmark_path=BENCHMARK_PATH, layers=STUDENT_LAYERS, hidden=None, heads=None,
+            intermediate=None, epochs=EPOCHS, temperature=TEMPERATURE, alpha=ALPHA,
+            learning_rate=LEARNING_RATE, max_length=MAX_LENGTH, seed=42):
+    """Soft-label, train and save the student; returns the teacher/student benchmark report."""
+    torch.manual_seed(seed)
+    tokenizer = AutoTokenizer.from_pretrained(teacher_dir)
+    teacher = AutoModelForSequenceClassification.from_pretrained(teacher_dir).eval()
+
+    data = load_distillation_texts(master_path, pool_path, pool_limit)
+    print(f"Soft-labelling {len(data)} texts ({(data['label'] == UNLABELLED).sum()} unlabelled)...")
+    teacher_logits = predict_logits(tokenizer, TorchClassifier(teacher), data["text"], max_length=max_length)
+    dataset = Dataset.from_dict({
+        "text": data["text"].tolist(),
+        "labels": data["label"].tolist(),
+        "teacher_logits": teacher_logits.tolist(),
+    })
+    dataset = tokenize_dataset(dataset, tokenizer, max_length)
+
+    student = AutoModelForSequenceClassification.from_config(
+        student_config(teacher.config, layers, hidden, heads, intermediate))
+    copied = init_from_teacher(student, teacher)
+    n_params = sum(p.numel() for p in student.parameters())
+    print(f"Student: {layers} layers, hidden {student.config.hidden_size}, {n_params / 1e6:.1f}M parameters "
+          f"({'initialized from teacher layers' if copied else 'random init'})")
+
+    args = make_training_args(str(Path(output_dir) / "checkpoints"), num_train_epochs=epochs,
+                              learning_rate=learning_rate, save_strategy="no", seed=seed,
+                              remove_unused_columns=False)
+    trainer = DistillationTrainer(
+        model=student, args=args, train_dataset=dataset, processing_class=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer), temperature=temperature, alpha=alpha,
+    )
+    trainer.train()
+    student.eval()
+
+    texts, labels = load_benchmark(benchmark_path)
+    teacher_metrics, teacher_time = timed_benchmark(tokenizer, teacher, texts, labels)
+    student_metrics, student_time = timed_benchmark(tokenizer, student, texts, labels)
+    print_metrics({"teacher": teacher_metrics, "student": student_metrics})
+    print(f"Benchmark of {len(texts)} abstracts: teacher {teacher_time:.1f}s, student {student_time:.1f}s "
+          f"({teacher_time / student_time:.2f}x)")
+
+    output_dir = Path(output_dir)
+    student.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    report = {
+        "teacher": str(teacher_dir),
+        "train_texts": len(data),
+        "student_layers": layers,
+        "student_hidden": student.config.hidden_size,
+        "student_parameters": n_params,
+        "teacher_metrics": teacher_metrics,
+        "student_metrics": student_metrics,
+        "speedup": teacher_time / student_time,
+    }
+    (output_dir / "distillation.json").write_text(json.dumps(report, indent=2))
+    print(f"Saved student -> {output_dir}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distil the fine-tuned classifier into a smaller student.")
+    parser.add_argument("--teacher", default=str(MODEL_DIR), help="teacher model directory")
+    parser.add_argument("--random-teacher", default=None, metavar="DIR",
+                        help="write a tiny random teacher to DIR and distil from it (smoke test)")
+    parser.add_argument("--output", default=str(STUDENT_DIR), help="student output directory")
+    parser.add_argument("--data", default=str(MASTER_PATH), help="labelled dataset (.parquet, .csv or .xlsx)")
+    parser.add_argument("--pool", default=None, help="unlabelled abstracts (.csv, .xlsx or .parquet)")
+    parser.add_argument("--pool-limit", type=int, default=None, help="max pool abstracts used")
+    parser.add_argument("--benchmark", default=str(BENCHMARK_PATH), help="labelled benchmark (.parquet, .xlsx or .csv)")
+    parser.add_argument("--layers", type=int, default=STUDENT_LAYERS, help="student encoder layers")
+    parser.add_argument("--hidden", type=int, default=None, help="student hidden size (default: teacher's)")
+    parser.add_argument("--heads", type=int, default=None, help="student attention heads")
+    parser.add_argument("--intermediate", type=int, default=None, help="student feed-forward size")
+    parser.add_argument("--epochs", type=float, default=EPOCHS)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="weight of the soft-label loss")
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.random_teacher:
+        args.teacher = make_random_teacher(args.random_teacher, tokenizer_dir=args.teacher)
+    distill(args.teacher, args.output, args.data, args.pool, args.pool_limit, args.benchmark,
+            args.layers, args.hidden, args.heads, args.intermediate, args.epochs, args.temperature,
+            args.alpha, args.learning_rate, args.max_length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Cached encoder embeddings and fast retraining of the classification head.
+
+    python embedding_cache.py encode train_set.parquet validation_set.parquet test_set.parquet
+    python embedding_cache.py retrain --class-weight balanced --output polyphenol_classifier_head
+
+The 12-layer encoder is run once per (model, text): the pooled [CLS] vector
+that BertForSequenceClassification feeds to its classifier is appended to a
+float32 file read back through np.memmap. Cache entries are keyed by a hash of
+the model files + max_length and by a hash of the text, like token_cache.py.
+Retraining the head (logistic regression on the cached vectors, optionally
+class-weighted) and tuning the decision threshold then take seconds.
+"""
+import argparse
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.linear_model import LogisticRegression
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from benchmark import benchmark_metrics, print_metrics
+from inference import BATCH_SIZE, MAX_BATCH_TOKENS, MODEL_DIR, length_sorted_batches, pad_batch, tokenize
+from token_cache import text_hash
+from training import MAX_LENGTH
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import read_table  # noqa: E402
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "embedding_cache"
+MODEL_FILES = ["config.json", "model.safetensors", "pytorch_model.bin"]
+HASH_DTYPE = "S32"
+
+
+def model_fingerprint(model_dir, max_length=MAX_LENGTH):
+    """Hash of the config + weight files and max_length."""
+    h = hashlib.sha256(str(max_length).encode())
+    for name in MODEL_FILES:
+        path = Path(model_dir) / name
+        if path.is_file():
+            h.update(name.encode())
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """
+    Append-only store of pooled encoder outputs:
+
+        <cache_dir>/<fingerprint>/embeddings.bin   float32, one row of hidden_size per text
+        <cache_dir>/<fingerprint>/index.npy        text hash of every row
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_length=MAX_LENGTH, cache_dir=CACHE_DIR):
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+        self.dim = self.model.config.hidden_size
+        self.dir = Path(cache_dir) / model_fingerprint(model_dir, max_length)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.dir / "embeddings.bin"
+        self.index_path = self.dir / "index.npy"
+
+        if self.index_path.exists():
+            self.index = np.load(self.index_path)
+        else:
+            self.index = np.zeros(0, dtype=HASH_DTYPE)
+        self.rows = {h: i for i, h in enumerate(self.index.tolist())}
+        self._data = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def _encode(self, texts, batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS):
+        """Pooled [CLS] vectors (the classifier's input) of `texts`, length-sorted batches."""
+        encodings = tokenize(self.tokenizer, texts, self.max_length)
+        lengths = np.array([len(ids) for ids in encodings["input_ids"]])
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        with torch.inference_mode():
+            for positions in length_sorted_batches(lengths, batch_size, max_tokens):
+                batch = {k: torch.from_numpy(v) for k, v in pad_batch(self.tokenizer, encodings, positions).items()}
+                out[positions] = self.model.base_model(**batch).pooler_output.numpy()
+        return out
+
+    def _append(self, texts, hashes):
+        vectors = self._encode(texts)
+        with open(self.data_path, "r+b" if self.data_path.exists() else "wb") as f:
+            # anything past the indexed rows is a leftover of an interrupted append
+            f.seek(len(self.index) * self.dim * 4)
+            f.truncate()
+            f.write(vectors.tobytes())
+        self.index = np.concatenate([self.index, np.array(hashes, dtype=HASH_DTYPE)])
+        tmp = self.dir / "index.tmp.npy"
+        np.save(tmp, self.index)
+        os.replace(tmp, self.index_path)
+        for i, h in enumerate(hashes):
+            self.rows[h] = len(self.index) - len(hashes) + i
+        self._data = None
+
+    def embeddings(self, texts):
+        """(n, hidden_size) embeddings of `texts`, running the encoder only on uncached ones."""
+        texts = ["" if pd.isna(t) else str(t) for t in texts]
+        hashes = [text_hash(t) for t in texts]
+        missing = {}
+        for t, h in zip(texts, hashes):
+            if h not in self.rows and h not in missing:
+                missing[h] = t
+        if missing:
+            print(f"Encoding {len(missing)} new texts ({len(texts) - len(missing)} cached)")
+            self._append(list(missing.values()), list(missing.keys()))
+        if self._data is None and len(self.index):
+            self._data = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(len(self.index), self.dim))
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(self._data[np.array([self.rows[h] for h in hashes])])
+
+
+# ---------- Classification head ----------
+def current_head(model):
+    """(weight, bias) of the model's classifier as numpy arrays."""
+    return model.classifier.weight.detach().numpy().copy(), model.classifier.bias.detach().numpy().copy()
+
+
+def head_scores(embeddings, weight, bias):
+    """Softmax probability of class 1 from cached embeddings and a (2, hidden) head."""
+    logits = embeddings @ weight.T + bias
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp[:, 1] / exp.sum(axis=1)
+
+
+def train_head(embeddings, labels, class_weight=None, C=1.0):
+    """
+    Logistic regression on cached embeddings, returned as a 2-class (weight, bias)
+    head: logits [0, w.x + b] give the same softmax as the sigmoid.
+    """
+    clf = LogisticRegression(C=C, class_weight=class_weight, max_iter=2000)
+    clf.fit(embeddings, labels)
+    weight = np.zeros((2, embeddings.shape[1]), dtype=np.float32)
+    bias = np.zeros(2, dtype=np.float32)
+    weight[1], bias[1] = clf.coef_[0], clf.intercept_[0]
+    return weight, bias
+
+
+def tune_threshold(labels, scores):
+    """Decision threshold with the best F1 on (labels, scores)."""
+    order = np.argsort(-scores, kind="stable")
+    hits = np.cumsum(np.asarray(labels)[order])
+    n_pos = hits[-1] if len(hits) else 0
+    if n_pos == 0:
+        return 0.5
+    k = np.arange(1, len(order) + 1)
+    f1 = 2 * hits / (k + n_pos)
+    return float(scores[order[int(np.argmax(f1))]])
+
+
+def save_with_head(cache, weight, bias, output_dir):
+    """Save the cached model with a new classifier head, in HF layout."""
+    model = cache.model
+    with torch.no_grad():
+        model.classifier.weight.copy_(torch.from_numpy(weight))
+        model.classifier.bias.copy_(torch.from_numpy(bias))
+    model.save_pretrained(output_dir)
+    cache.tokenizer.save_pretrained(output_dir)
+
+
+def load_split(path):
+    df = read_table(path, columns=["abstract", "label"]).dropna(subset=["abstract", "label"])
+    return df["abstract"].tolist(), df["label"].astype(int).to_numpy()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cache pooled encoder embeddings and retrain the classifier head.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    encode = sub.add_parser("encode", help="fill the cache for the abstracts of these tables")
+    encode.add_argument("inputs", nargs="+")
+
+    retrain = sub.add_parser("retrain", help="fit a new head on cached embeddings")
+    retrain.add_argument("--train", default="train_set.parquet")
+    retrain.add_argument("--eval", default="validation_set.parquet", help="split the threshold is tuned on")
+    retrain.add_argument("--test", default="test_set.parquet", help="held-out split the metrics are reported on")
+    retrain.add_argument("--class-weight", choices=["balanced"], default=None)
+    retrain.add_argument("--C", type=float, default=1.0, help="inverse L2 regularization")
+    retrain.add_argument("--output", default=None, help="save the model with the new head here")
+
+    for p in (encode, retrain):
+        p.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+        p.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cache = EmbeddingCache(args.model, args.max_length)
+    if args.command == "encode":
+        for path in args.inputs:
+            cache.embeddings(read_table(path, columns=["abstract"])["abstract"].dropna().tolist())
+        print(f"{len(cache)} embeddings cached in {cache.dir}")
+        return
+
+    train_texts, train_labels = load_split(args.train)
+    eval_texts, eval_labels = load_split(args.eval)
+    test_texts, test_labels = load_split(args.test)
+    x_train, x_eval, x_test = (cache.embeddings(t) for t in (train_texts, eval_texts, test_texts))
+
+    weight, bias = train_head(x_train, train_labels, args.class_weight, args.C)
+    # the threshold is picked on --eval and judged on --test, so "tuned" is not scored on its own split
+    threshold = tune_threshold(eval_labels, head_scores(x_eval, weight, bias))
+    old_scores = head_scores(x_test, *current_head(cache.model))
+    new_scores = head_scores(x_test, weight, bias)
+    print(f"Metrics on {args.test}:")
+    print_metrics({
+        "current": benchmark_metrics(test_labels, old_scores),
+        "retrained": benchmark_metrics(test_labels, new_scores),
+        "tuned": benchmark_metrics(test_labels, new_scores, threshold),
+    })
+    print(f"Best-F1 threshold on {args.eval}: {threshold:.4f}")
+    if args.output:
+        save_with_head(cache, weight, bias, args.output)
+        print(f"Saved model with retrained head -> {args.output}")
+        # the scorers return probabilities; the threshold is not stored with the model
+        print(f"Label its scores with `score >= {threshold:.4f}` "
+              f"(e.g. benchmark_metrics(..., threshold={threshold:.4f})) instead of 0.5.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+MODEL_DIR = Path(__file__).resolve().parent / "polyphenol_classifier_final"
+MAX_LENGTH = 512
+BATCH_SIZE = 32
+# padded tokens per batch (batch size x longest sequence); bounds memory for long abstracts
+MAX_BATCH_TOKENS = 16384
+CHUNK_SIZE = 10000
+
+TEXT_COLUMNS = ["abstract", "Abstract", "text"]
+BACKENDS = ["torch", "onnx", "int8"]
+
+
+# ---------- Model ----------
+class TorchClassifier:
+    """PyTorch backend: numpy batch in, numpy logits out."""
+
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def logits(self, batch):
+        with torch.inference_mode():
+            inputs = {k: torch.from_numpy(np.asarray(v)) for k, v in batch.items()}
+            return self.model(**inputs).logits.numpy()
+
+
+def load_model(model_dir=MODEL_DIR, num_threads=None, backend="torch", onnx_path=None):
+    """
+    Load tokenizer + classifier backend. num_threads sets the intra-op CPU threads.
+    backend="onnx" runs the graph written by onnx_backend.py (default: <model_dir>/model.onnx);
+    backend="int8" expects model_dir to be a directory written by quantize.py.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    if backend == "onnx":
+        from onnx_backend import OnnxClassifier, ONNX_FILE
+        return tokenizer, OnnxClassifier(onnx_path or Path(model_dir) / ONNX_FILE, num_threads)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if backend == "int8":
+        from quantize import load_quantized
+        return tokenizer, TorchClassifier(load_quantized(model_dir))
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    return tokenizer, TorchClassifier(model)
+
+
+def softmax_class1(logits):
+    """Softmax probability of class 1 for a (n, 2) logits array."""
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return (exp[:, 1] / exp.sum(axis=-1)).astype(np.float32)
+
+
+# ---------- Length-sorted dynamic batching ----------
+def length_sorted_batches(lengths, batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS):
+    """
+    Group positions of similar length together: sort by length and cut a new batch
+    when it reaches batch_size items or its padded size (n x longest) would pass max_tokens.
+    Returns a list of index arrays into `lengths`.
+    """
+    order = np.argsort(lengths, kind="stable")
+    batches, current, longest = [], [], 0
+    for pos in order:
+        new_longest = max(longest, lengths[pos])
+        if current and (len(current) >= batch_size or new_longest * (len(current) + 1) > max_tokens):
+            batches.append(np.array(current))
+            current, new_longest = [], lengths[pos]
+        current.append(pos)
+        longest = new_longest
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+
+def tokenize(tokenizer, texts, max_length=MAX_LENGTH):
+    """Tokenize without padding; every sequence keeps its own length."""
+    return tokenizer(list(texts), truncation=True, max_length=max_length, padding=False)
+
+
+def pad_batch(tokenizer, encodings, positions):
+    """
+    Pad only the rows in `positions`, to the longest of them. Same arrays as
+    tokenizer.pad(padding="longest"), filled directly with numpy.
+    """
+    pad_values = {"input_ids": tokenizer.pad_token_id, "token_type_ids": tokenizer.pad_token_type_id}
+    rows = [encodings["input_ids"][i] for i in positions]
+    longest = max(len(r) for r in rows)
+    batch = {}
+    for key in encodings.keys():
+        arr = np.full((len(positions), longest), pad_values.get(key, 0), dtype=np.int64)
+        for j, i in enumerate(positions):
+            values = encodings[key][i]
+            if tokenizer.padding_side == "left":
+                arr[j, longest - len(values):] = values
+            else:
+                arr[j, :len(values)] = values
+        batch[key] = arr
+    return batch
+
+
+def prepare_batches(tokenizer, texts, batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS,
+                    max_length=MAX_LENGTH):
+    """
+    CPU-side half of scoring: tokenize `texts` and pad them into length-sorted
+    batches. Returns a list of (positions, padded batch).
+    """
+    texts = ["" if pd.isna(t) else str(t) for t in texts]
+    if not texts:
+        return []
+    encodings = tokenize(tokenizer, texts, max_length)
+    lengths = np.array([len(ids) for ids in encodings["input_ids"]])
+    return [(positions, pad_batch(tokenizer, encodings, positions))
+            for positions in length_sorted_batches(lengths, batch_size, max_tokens)]
+
+
+def run_batches(model, batches, n):
+    """Model half of scoring: (n, num_labels) logits of prepared batches, in input order."""
+    logits = None
+    for positions, batch in batches:
+        out = model.logits(batch)
+        if logits is None:
+            logits = np.empty((n, out.shape[-1]), dtype=np.float32)
+        logits[positions] = out
+    return logits if logits is not None else np.zeros((n, 2), dtype=np.float32)
+
+
+def predict_logits(tokenizer, model, texts, batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS,
+                   max_length=MAX_LENGTH):
+    """
+    Raw (n, num_labels) logits for every text, in input order.
+    """
+    texts = list(texts)
+    return run_batches(model, prepare_batches(tokenizer, texts, batch_size, max_tokens, max_length), len(texts))
+
+
+def score_texts(tokenizer, model, texts, batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS,
+                max_length=MAX_LENGTH):
+    """
+    Relevance score (softmax probability of class 1) for every text, in input order.
+    """
+    return softmax_class1(predict_logits(tokenizer, model, texts, batch_size, max_tokens, max_length))
+
+
+# ---------- Table I/O ----------
+def iter_table(path, chunk_size=CHUNK_SIZE, columns=None):
+    """Yield DataFrame chunks of a CSV / Parquet file (XLSX is read in one piece)."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif suffix in (".xlsx", ".xls"):
+        yield pd.read_excel(path, usecols=columns)
+    else:
+        raise ValueError(f"Unsupported input format: {path}")
+
+
+class TableWriter:
+    """Append DataFrame chunks to a CSV / Parquet file; XLSX is buffered and written on close."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.suffix = self.path.suffix.lower()
+        if self.suffix not in (".csv", ".parquet", ".xlsx"):
+            raise ValueError(f"Unsupported output format: {path}")
+        self._parquet = None
+        self._buffer = []
+        self._header = True
+        if self.path.exists():
+            os.remove(self.path)
+
+    def write(self, df):
+        if self.suffix == ".csv":
+            df.to_csv(self.path, mode="a", header=self._header, index=False)
+            self._header = False
+        elif self.suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # pandas types an all-NaN column as float: in Arrow it has no type at all
+            for i, column in enumerate(table.columns):
+                if len(table) and column.null_count == len(table):
+                    table = table.set_column(i, pa.field(table.field(i).name, pa.null()), pa.nulls(len(table)))
+            if self._parquet is None:
+                # a column that is all-null in the first chunk has no type yet: write it as text
+                schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in table.schema], metadata=table.schema.metadata)
+                self._parquet = pq.ParquetWriter(self.path, schema)
+            # later chunks can infer other dtypes (an int column with a NaN turns float, a column
+            # can be all-null): the file keeps the first chunk's schema
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            self._buffer.append(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._buffer:
+            pd.concat(self._buffer, ignore_index=True).to_excel(self.path, index=False)
+
+
+def find_text_column(columns, preferred=None):
+    if preferred:
+        if preferred not in columns:
+            raise ValueError(f"Column '{preferred}' not found; available: {list(columns)}")
+        return preferred
+    for c in TEXT_COLUMNS:
+        if c in columns:
+            return c
+    raise ValueError(f"No text column found (tried {TEXT_COLUMNS}); use --text-column")
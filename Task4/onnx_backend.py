@@ -0,0 +1,156 @@
+"""
+ONNX export and ONNX Runtime backend for the polyphenol classifier.
+
+    python onnx_backend.py export                        # -> polyphenol_classifier_final/model.onnx
+    python onnx_backend.py export --check ../data/benchmark.xlsx
+    python onnx_backend.py check ../data/abstracts.csv --limit 500
+
+The graph has dynamic batch and sequence axes, so it works with the
+length-sorted dynamic batches of inference.py. Select it with
+`load_model(..., backend="onnx")` or `score_abstracts.py --backend onnx`.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inference import MAX_LENGTH, MODEL_DIR, iter_table, find_text_column, load_model, score_texts
+
+ONNX_FILE = "model.onnx"
+OPSET = 17
+# max |score difference| allowed between PyTorch and ONNX Runtime
+PARITY_TOLERANCE = 1e-4
+PARITY_SAMPLES = 256
+
+# positional order of BertForSequenceClassification.forward
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+# ---------- Export ----------
+def export_onnx(model_dir=MODEL_DIR, output_path=None, opset=OPSET):
+    """Export the classifier's logits as an ONNX graph with dynamic batch/sequence axes."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    output_path = Path(output_path or Path(model_dir) / ONNX_FILE)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(["polyphenol intake and cardiovascular risk", "resveratrol"],
+                       padding=True, return_tensors="pt")
+    input_names = [name for name in INPUT_NAMES if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(output_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+    print(f"Exported {model_dir} -> {output_path} ({output_path.stat().st_size / 1e6:.1f} MB)")
+    return output_path
+
+
+# ---------- Runtime ----------
+class OnnxClassifier:
+    """ONNX Runtime backend with the same interface as inference.TorchClassifier."""
+
+    def __init__(self, onnx_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def logits(self, batch):
+        feeds = {name: np.asarray(batch[name], dtype=np.int64) for name in self.input_names}
+        return self.session.run(["logits"], feeds)[0]
+
+
+# ---------- Parity ----------
+def check_parity(texts, model_dir=MODEL_DIR, onnx_path=None, tolerance=PARITY_TOLERANCE,
+                 max_length=MAX_LENGTH, num_threads=None):
+    """
+    Score `texts` with both backends. Raises ValueError if any relevance score
+    differs by more than `tolerance`; returns a dict with the max difference and timings.
+    """
+    tokenizer, torch_model = load_model(model_dir, num_threads=num_threads, backend="torch")
+    _, onnx_model = load_model(model_dir, num_threads=num_threads, backend="onnx", onnx_path=onnx_path)
+
+    start = time.perf_counter()
+    torch_scores = score_texts(tokenizer, torch_model, texts, max_length=max_length)
+    torch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    onnx_scores = score_texts(tokenizer, onnx_model, texts, max_length=max_length)
+    onnx_time = time.perf_counter() - start
+
+    diff = float(np.abs(torch_scores - onnx_scores).max()) if len(texts) else 0.0
+    report = {"n": len(texts), "max_abs_diff": diff, "torch_s": torch_time, "onnx_s": onnx_time}
+    print(f"Parity on {len(texts)} texts: max |diff| = {diff:.2e} (tolerance {tolerance:.0e}); "
+          f"torch {torch_time:.2f}s, onnx {onnx_time:.2f}s")
+    if diff > tolerance:
+        raise ValueError(f"ONNX scores differ from PyTorch by {diff:.2e} > {tolerance:.0e}")
+    return report
+
+
+def read_texts(path, text_column=None, limit=PARITY_SAMPLES):
+    texts = []
+    for chunk in iter_table(path):
+        column = find_text_column(chunk.columns, text_column)
+        texts.extend(chunk[column].tolist())
+        if len(texts) >= limit:
+            break
+    return texts[:limit]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the classifier to ONNX and check parity with PyTorch.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="write the ONNX graph")
+    export.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+    export.add_argument("--output", default=None, help="ONNX file (default: <model>/model.onnx)")
+    export.add_argument("--opset", type=int, default=OPSET)
+    export.add_argument("--check", default=None, metavar="TABLE",
+                        help="run the parity check on this .csv/.xlsx/.parquet after exporting")
+
+    check = sub.add_parser("check", help="compare ONNX and PyTorch scores")
+    check.add_argument("input", help="table with abstracts (.csv, .xlsx or .parquet)")
+    check.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+    check.add_argument("--onnx-path", default=None, help="ONNX file (default: <model>/model.onnx)")
+
+    for p in (export, check):
+        p.add_argument("--text-column", default=None)
+        p.add_argument("--limit", type=int, default=PARITY_SAMPLES, help="texts used for the parity check")
+        p.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE)
+        p.add_argument("--threads", type=int, default=None, help="CPU threads")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "export":
+        onnx_path = export_onnx(args.model, args.output, args.opset)
+        table = args.check
+    else:
+        onnx_path = args.onnx_path
+        table = args.input
+    if table:
+        texts = read_texts(table, args.text_column, args.limit)
+        check_parity(texts, args.model, onnx_path, args.tolerance, num_threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
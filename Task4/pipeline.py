@@ -0,0 +1,122 @@
+"""
+Pipelined table scoring: read and tokenize ahead while the model runs.
+
+    reader thread  ->  tokenizer threads  ->  model (caller's thread)  ->  writer
+          bounded queue             bounded queue
+
+The reader streams chunks of the input table; each tokenizer thread turns a
+chunk into padded length-sorted batches with the fast tokenizer's batch call
+(the Rust tokenizer releases the GIL, so this overlaps with the forward pass).
+Scored chunks are written as soon as they are done, in input order. At most
+`prefetch` chunks wait in each queue, and the reader takes a slot of a window
+of 2 * prefetch + tokenizer_threads chunks before handing a chunk on; the slot
+is freed once the chunk is written. Chunks tokenized ahead of a slow one wait
+inside that window, so memory does not grow with the input.
+"""
+import copy
+import queue
+import threading
+
+from inference import (
+    BATCH_SIZE, CHUNK_SIZE, MAX_BATCH_TOKENS, MAX_LENGTH,
+    TableWriter, find_text_column, iter_table, prepare_batches, run_batches, softmax_class1,
+)
+
+TOKENIZER_THREADS = 2
+PREFETCH = 2
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def _reader(path, chunk_size, out_queue, stop, n_workers, window):
+    try:
+        for seq, chunk in enumerate(iter_table(path, chunk_size=chunk_size)):
+            # slots are taken in input order, so the chunk the writer waits for always holds one
+            while not stop.is_set() and not window.acquire(timeout=0.5):
+                continue
+            while not stop.is_set():
+                try:
+                    out_queue.put((seq, chunk), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+    except Exception as e:
+        out_queue.put(_Failure(e))
+    for _ in range(n_workers):
+        out_queue.put(_DONE)
+
+
+def _tokenizer_worker(tokenizer, in_queue, out_queue, stop, text_column, batch_size, max_tokens, max_length):
+    # each thread has its own copy: a fast tokenizer's truncation state is not thread-safe
+    tokenizer = copy.deepcopy(tokenizer)
+    while not stop.is_set():
+        item = in_queue.get()
+        if item is _DONE or isinstance(item, _Failure):
+            out_queue.put(item)
+            return
+        seq, chunk = item
+        try:
+            column = find_text_column(chunk.columns, text_column)
+            batches = prepare_batches(tokenizer, chunk[column], batch_size, max_tokens, max_length)
+        except Exception as e:
+            out_queue.put(_Failure(e))
+            return
+        out_queue.put((seq, chunk, batches))
+
+
+def score_table(tokenizer, model, input_path, output_path, text_column=None, chunk_size=CHUNK_SIZE,
+                batch_size=BATCH_SIZE, max_tokens=MAX_BATCH_TOKENS, max_length=MAX_LENGTH,
+                tokenizer_threads=TOKENIZER_THREADS, prefetch=PREFETCH, on_chunk=None):
+    """
+    Add a `relevance_score` column to every row of input_path and write it to
+    output_path chunk by chunk. on_chunk(n_rows_done) is called after each write.
+    Returns the number of rows scored.
+    """
+    raw_chunks = queue.Queue(maxsize=prefetch)
+    ready = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    window = threading.BoundedSemaphore(2 * prefetch + tokenizer_threads)
+    threads = [threading.Thread(target=_reader, daemon=True,
+                                args=(input_path, chunk_size, raw_chunks, stop, tokenizer_threads, window))]
+    threads += [
+        threading.Thread(target=_tokenizer_worker, daemon=True,
+                         args=(tokenizer, raw_chunks, ready, stop, text_column, batch_size, max_tokens, max_length))
+        for _ in range(tokenizer_threads)
+    ]
+    for t in threads:
+        t.start()
+
+    writer = TableWriter(output_path)
+    pending = {}
+    next_seq, n_rows, finished = 0, 0, 0
+    try:
+        while finished < tokenizer_threads:
+            item = ready.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            if isinstance(item, _Failure):
+                raise item.error
+            seq, chunk, batches = item
+            pending[seq] = (chunk, batches)
+            # tokenizer threads may finish out of order; score and write in input order
+            while next_seq in pending:
+                chunk, batches = pending.pop(next_seq)
+                chunk["relevance_score"] = softmax_class1(run_batches(model, batches, len(chunk)))
+                writer.write(chunk)
+                window.release()
+                n_rows += len(chunk)
+                next_seq += 1
+                if on_chunk is not None:
+                    on_chunk(n_rows)
+    finally:
+        stop.set()
+        writer.close()
+    return n_rows
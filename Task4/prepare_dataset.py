@@ -1,27 +1,53 @@
-python
+# python
+import argparse
 import pandas as pd
-import numpy as np
 import sys
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import COLUMNS, dataset_path, import_legacy, read_dataset, write_dataset  # noqa: E402
+from sampling import Reservoir, StratifiedReservoir, row_priorities  # noqa: E402
+
+NEGATIVE_POOL = "non_relevant_publications"
+SEED = 42
+# negative pool rows read per chunk; memory is this plus the sample
+CHUNK_SIZE = 50_000
+# publication years are stratified in bins of this many years
+YEAR_BIN = 5
+STRATUM_COLUMNS = {"year": "year_of_publication", "journal": "journal_name"}
+
+parser = argparse.ArgumentParser(description="Build the balanced master dataset.")
+parser.add_argument("--stratify", choices=sorted(STRATUM_COLUMNS), default=None,
+                    help="sample negatives with the year / journal distribution of the relevant documents")
+parser.add_argument("--seed", type=int, default=SEED)
+parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+args = parser.parse_args()
+
+
+def valid_rows(df):
+    """Rows with a non-empty abstract that is not just the title."""
+    abstract = df['abstract'].fillna('').astype(str).str.strip()
+    title = df['title'].fillna('').astype(str).str.strip()
+    return ((abstract != '') & (abstract != title)).to_numpy()
+
+
+def strata_of(values, kind):
+    if kind == "year":
+        years = pd.to_numeric(pd.Series(values), errors="coerce")
+        return [None if pd.isna(y) else int(y) // YEAR_BIN * YEAR_BIN for y in years]
+    return [None if pd.isna(j) or not str(j).strip() else str(j).strip().casefold() for j in values]
+
 
 try:
-    df_relevant_all = pd.read_csv("../data/abstracts_filled.csv")
+    df_relevant_all = read_dataset("abstracts_filled", columns=COLUMNS)
     print(f"Loaded {len(df_relevant_all)} RELEVANT documents (before filtering).")
-except FileNotFoundError:
-    print("ERROR: File `../data/abstracts_filled.csv` not found.")
+except FileNotFoundError as e:
+    print(f"ERROR: {e}")
     sys.exit(1)
 
-for col in ['title', 'abstract']:
-    if col not in df_relevant_all.columns:
-        print(f"ERROR: Column `{col}` not found in `../data/abstracts_filled.csv`.")
-        sys.exit(1)
-
-df_relevant_all['abstract'] = df_relevant_all['abstract'].fillna('').astype(str)
-df_relevant_all['title'] = df_relevant_all['title'].fillna('').astype(str)
-df_relevant_all['abstract_stripped'] = df_relevant_all['abstract'].str.strip()
-df_relevant_all['title_stripped'] = df_relevant_all['title'].str.strip()
-
-df_relevant = df_relevant_all[df_relevant_all['abstract_stripped'] != ''].copy()
-df_relevant = df_relevant[df_relevant['title_stripped'] != df_relevant['abstract_stripped']].copy()
+df_relevant = df_relevant_all[valid_rows(df_relevant_all)].copy()
 
 N_DATASET_SIZE = len(df_relevant)
 print(f"Relevant documents kept (with valid abstract and different from title): {N_DATASET_SIZE}")
@@ -30,39 +56,75 @@ if N_DATASET_SIZE == 0:
     print("ERROR: No relevant documents available after filters.")
     sys.exit(1)
 
-try:
-    df_non_relevant_all = pd.read_excel("../data/non_relevant_publications.xlsx")
-    print(f"Loaded {len(df_non_relevant_all)} NON-RELEVANT documents (before sampling).")
-except FileNotFoundError:
-    print("ERROR: File `../data/non_relevant_publications.xlsx` not found.")
-    sys.exit(1)
+pool_path = dataset_path(NEGATIVE_POOL)
+if not pool_path.exists():
+    try:
+        import_legacy(NEGATIVE_POOL)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+pool = pq.ParquetFile(pool_path)
+columns = list(COLUMNS)
 
-if len(df_non_relevant_all) < N_DATASET_SIZE:
+if args.stratify:
+    stratum_column = STRATUM_COLUMNS[args.stratify]
+    if stratum_column not in pool.schema_arrow.names:
+        print(f"ERROR: `{pool_path}` has no `{stratum_column}` column to stratify by {args.stratify}.")
+        sys.exit(1)
+    columns.append(stratum_column)
+    # the relevant documents' year / journal comes from publications, matched on indice
+    publications = read_dataset("publications", columns=["indice", stratum_column])
+    relevant_strata = df_relevant[['indice']].merge(publications, on='indice', how='left')[stratum_column]
+    quotas = pd.Series(strata_of(relevant_strata, args.stratify)).value_counts().to_dict()
+    reservoir = StratifiedReservoir(quotas, id_column='_key', total=N_DATASET_SIZE)
+    print(f"Stratifying NON-RELEVANT documents by {args.stratify}: {len(quotas)} strata")
+else:
+    reservoir = Reservoir(N_DATASET_SIZE)
+
+# One pass over the pool, chunk by chunk: filter, then offer to a seeded bottom-k reservoir.
+# A row's priority depends only on its PMID (or text) and the seed, so the sample does not
+# depend on the chunk size or on the order of the pool.
+n_pool = n_valid = 0
+for batch in pool.iter_batches(batch_size=args.chunk_size, columns=columns):
+    chunk = batch.to_pandas()
+    n_pool += len(chunk)
+    chunk = chunk[valid_rows(chunk)].reset_index(drop=True)
+    n_valid += len(chunk)
+    chunk['_key'] = chunk['pmid'].where(chunk['pmid'].notna(), chunk['abstract'])
+    priorities = row_priorities(chunk['_key'], args.seed)
+    if args.stratify:
+        reservoir.offer(chunk, priorities, strata_of(chunk[stratum_column], args.stratify))
+    else:
+        reservoir.offer(chunk, priorities)
+
+print(f"Streamed {n_pool} NON-RELEVANT documents, {n_valid} with valid abstract and different from title.")
+
+if args.stratify:
+    df_non_relevant, shortfall = reservoir.sample()
+    if shortfall:
+        print(f"WARNING: {sum(shortfall.values())} negatives taken outside their stratum "
+              f"({len(shortfall)} strata had too few candidates).")
+else:
+    df_non_relevant = reservoir.sample()
+
+if len(df_non_relevant) < N_DATASET_SIZE:
     print("ERROR: Not enough NON-RELEVANT documents to balance the dataset.")
     sys.exit(1)
 
-df_non_relevant = df_non_relevant_all.sample(
-    n=N_DATASET_SIZE,
-    random_state=42
-).copy()
-
 print(f"NON-RELEVANT documents sampled: {len(df_non_relevant)}")
 
 df_relevant['label'] = 1
 df_non_relevant['label'] = 0
 
-df_relevant['text'] = df_relevant['abstract'].fillna('')
-df_non_relevant['text'] = df_non_relevant['Abstract'].fillna('')
-
-df_relevant_final = df_relevant[['text', 'label']]
-df_non_relevant_final = df_non_relevant[['text', 'label']]
+# the master dataset keeps the whole schema; the model reads only abstract and label
+df_relevant_final = df_relevant[COLUMNS]
+df_non_relevant_final = df_non_relevant[COLUMNS]
 
 df_master = pd.concat([df_relevant_final, df_non_relevant_final], ignore_index=True)
 df_master = df_master.sample(frac=1, random_state=42).reset_index(drop=True)
 
-df_master.to_csv("../data/master_dataset_pulito.csv", index=False)
+master_path = write_dataset(df_master, "master_dataset_pulito")
 
-print(f"\nDataset `../data/master_dataset_pulito.csv` created successfully.")
+print(f"\nDataset `{master_path}` created successfully.")
 print(f"Total documents: {len(df_master)}")
 print(f"Class distribution (now balanced):\n{df_master['label'].value_counts()}")
-
@@ -0,0 +1,122 @@
+"""
+Int8 dynamic quantization of the polyphenol classifier for CPU scoring.
+
+    python quantize.py                        # -> polyphenol_classifier_final-int8/
+    python quantize.py --max-drop 0.005 --benchmark ../data/benchmark.xlsx
+
+Every nn.Linear (attention, feed-forward, classifier head) gets int8 weights;
+activations are quantized on the fly. Before saving, fp32 and int8 models
+are scored on the Task5 benchmark and the artifact is written only if no
+guarded metric (F1, MAP, nDCG, R-Precision) drops by more than --max-drop.
+Score with it through `score_abstracts.py --backend int8 --model <dir>`.
+"""
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+from benchmark import (
+    BENCHMARK_PATH, MAX_METRIC_DROP, evaluate_model, load_benchmark, metric_regressions, print_metrics,
+)
+from inference import MODEL_DIR, TorchClassifier
+
+QUANTIZED_SUFFIX = "-int8"
+WEIGHTS_FILE = "quantized_model.pt"
+REPORT_FILE = "quantization.json"
+TOKENIZER_FILES = ["tokenizer.json", "vocab.txt", "tokenizer_config.json", "special_tokens_map.json"]
+
+
+def quantize_model(model):
+    """Int8 dynamic quantization of all Linear layers (weights int8, activations per batch)."""
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def save_quantized(model, model_dir, output_dir, report):
+    """config + tokenizer copied from model_dir, quantized state_dict, and the benchmark report."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model.config.save_pretrained(output_dir)
+    for name in TOKENIZER_FILES:
+        if (Path(model_dir) / name).is_file():
+            shutil.copy2(Path(model_dir) / name, output_dir / name)
+    torch.save(model.state_dict(), output_dir / WEIGHTS_FILE)
+    (output_dir / REPORT_FILE).write_text(json.dumps(report, indent=2))
+
+
+def load_quantized(quantized_dir):
+    """Rebuild the int8 model saved by save_quantized."""
+    config = AutoConfig.from_pretrained(quantized_dir)
+    model = quantize_model(AutoModelForSequenceClassification.from_config(config))
+    # packed int8 weights are not plain tensors, so weights_only loading is not possible
+    state = torch.load(Path(quantized_dir) / WEIGHTS_FILE, map_location="cpu", weights_only=False)
+    model.load_state_dict(state)
+    return model.eval()
+
+
+def timed_metrics(tokenizer, model, texts, labels):
+    start = time.perf_counter()
+    metrics = evaluate_model(tokenizer, TorchClassifier(model), texts, labels)
+    return metrics, time.perf_counter() - start
+
+
+def build_quantized(model_dir=MODEL_DIR, output_dir=None, benchmark_path=BENCHMARK_PATH,
+                    max_drop=MAX_METRIC_DROP, num_threads=None):
+    """
+    Quantize, benchmark against fp32 and save. Returns the report; raises
+    ValueError (nothing written) if a guarded metric drops by more than max_drop.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    output_dir = Path(output_dir or str(Path(model_dir)) + QUANTIZED_SUFFIX)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    texts, labels = load_benchmark(benchmark_path)
+
+    fp32_metrics, fp32_time = timed_metrics(tokenizer, model, texts, labels)
+    qmodel = quantize_model(model)
+    int8_metrics, int8_time = timed_metrics(tokenizer, qmodel, texts, labels)
+
+    print_metrics({"fp32": fp32_metrics, "int8": int8_metrics})
+    print(f"Benchmark of {len(texts)} abstracts: fp32 {fp32_time:.1f}s, int8 {int8_time:.1f}s "
+          f"({fp32_time / int8_time:.2f}x)")
+
+    regressions = metric_regressions(fp32_metrics, int8_metrics, max_drop)
+    if regressions:
+        lines = ", ".join(f"{m} {ref:.4f} -> {new:.4f}" for m, (ref, new) in regressions.items())
+        raise ValueError(f"Int8 model not saved, metrics dropped by more than {max_drop}: {lines}")
+
+    report = {
+        "source": str(model_dir),
+        "benchmark": str(benchmark_path),
+        "max_drop": max_drop,
+        "fp32": fp32_metrics,
+        "int8": int8_metrics,
+        "speedup": fp32_time / int8_time,
+    }
+    save_quantized(qmodel, model_dir, output_dir, report)
+    print(f"Saved int8 model -> {output_dir}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Int8 dynamic quantization with a benchmark guard.")
+    parser.add_argument("--model", default=str(MODEL_DIR), help="fp32 model directory")
+    parser.add_argument("--output", default=None, help=f"output directory (default: <model>{QUANTIZED_SUFFIX})")
+    parser.add_argument("--benchmark", default=str(BENCHMARK_PATH), help="labelled benchmark (.parquet, .xlsx or .csv)")
+    parser.add_argument("--max-drop", type=float, default=MAX_METRIC_DROP,
+                        help="largest allowed drop of F1/MAP/nDCG/R-Precision")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    build_quantized(args.model, args.output, args.benchmark, args.max_drop, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Vectorized ranking metrics for relevance scores: MAP, MRR, nDCG, P@k, R-Precision, ROC-AUC.
+
+All metrics of one ranking come from a single descending sort and a cumulative
+sum of the sorted labels. Stand-alone P@k / R-Precision only partially sort
+(np.argpartition) the top k. Bootstrap confidence intervals resample all rounds
+at once as a (rounds, n) array and run the same code on every row.
+
+Tied scores follow sklearn where sklearn has the metric: MAP is the
+step-wise average precision of average_precision_score (a tie group counts
+as one threshold), nDCG gives every document of a tie group the group's mean
+discount like ndcg_score, and ROC-AUC gives tied scores their average rank.
+P@k, R-Precision and MRR need one order, and rank equal scores by input
+order (stable sort). NaN scores rank last, as -inf.
+"""
+import numpy as np
+
+DEFAULT_KS = (5, 10, 20)
+BOOTSTRAP_ROUNDS = 1000
+CONFIDENCE = 0.95
+# (rounds x documents) cells resampled per block, bounds bootstrap memory
+MAX_BOOTSTRAP_CELLS = 20_000_000
+
+
+def _mask_nan(scores):
+    """Float scores with NaN replaced by -inf, so missing scores rank last."""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.where(np.isnan(scores), -np.inf, scores)
+
+
+# ---------- Top-k ----------
+def top_k(scores, k):
+    """Indices of the k highest scores, best first; only the top k are sorted."""
+    scores = _mask_nan(scores)
+    k = min(int(k), len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > kth)
+        # ties on the k-th score are taken in input order, as the stable sort would
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        part = np.concatenate([above, ties])
+    else:
+        part = np.arange(len(scores))
+    return part[np.lexsort((part, -scores[part]))]
+
+
+def precision_at_k(y_true, y_score, k):
+    if k <= 0:
+        return 0.0
+    return float(np.asarray(y_true)[top_k(y_score, k)].sum() / k)
+
+
+def r_precision(y_true, y_score):
+    """Precision@R, with R the number of relevant documents."""
+    r = int(np.asarray(y_true).sum())
+    return precision_at_k(y_true, y_score, r) if r else 0.0
+
+
+def mean_reciprocal_rank(y_true, y_score):
+    """1 / rank of the first relevant document, without sorting."""
+    y_true = np.asarray(y_true).astype(bool)
+    y_score = _mask_nan(y_score)
+    if not y_true.any():
+        return 0.0
+    positions = np.flatnonzero(y_true)
+    best = positions[np.argmax(y_score[positions])]
+    # documents ranked above `best`: higher score, or same score earlier in the input
+    above = (y_score > y_score[best]).sum() + (y_score[:best] == y_score[best]).sum()
+    return 1.0 / (above + 1)
+
+
+# ---------- Batched core ----------
+def _sorted(labels, scores):
+    """(labels, scores) of every row sorted by descending score (stable)."""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(labels, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def _tie_groups(s):
+    """First and last position of the tie group of every cell of row-wise sorted scores."""
+    n = s.shape[1]
+    pos = np.arange(n)
+    new_group = np.ones_like(s, dtype=bool)
+    new_group[:, 1:] = s[:, 1:] != s[:, :-1]
+    first = np.maximum.accumulate(np.where(new_group, pos, 0), axis=1)
+    group_end = np.ones_like(s, dtype=bool)
+    group_end[:, :-1] = new_group[:, 1:]
+    last = np.minimum.accumulate(np.where(group_end, pos, n - 1)[:, ::-1], axis=1)[:, ::-1]
+    return first, last
+
+
+def _auc(labels, scores):
+    """Row-wise ROC-AUC through the rank-sum statistic with average ranks for ties."""
+    n = scores.shape[1]
+    order = np.argsort(scores, axis=1, kind="stable")
+    s = np.take_along_axis(scores, order, axis=1)
+    rel = np.take_along_axis(labels, order, axis=1)
+    first, last = _tie_groups(s)
+    midrank = (first + last) / 2.0 + 1.0
+
+    n_pos = rel.sum(axis=1)
+    n_neg = n - n_pos
+    rank_sum = (midrank * rel).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        auc = (rank_sum - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
+    return np.where((n_pos > 0) & (n_neg > 0), auc, np.nan)
+
+
+def _metrics(labels, scores, ks=DEFAULT_KS):
+    """All metrics for every row of (rows, n) labels/scores; returns {name: (rows,) array}."""
+    labels = labels.astype(np.int64)
+    scores = _mask_nan(scores)
+    rows, n = labels.shape
+    rel, s = _sorted(labels, scores)
+    hits = np.cumsum(rel, axis=1)
+    ranks = np.arange(1, n + 1)
+    n_pos = hits[:, -1]
+    has_pos = n_pos > 0
+    safe_pos = np.maximum(n_pos, 1)
+
+    # tie-aware AP and DCG: precision at the end of each document's tie group,
+    # and the mean discount over the group
+    first, last = _tie_groups(s)
+    precision = np.take_along_axis(hits, last, axis=1) / (last + 1)
+    discounts = 1.0 / np.log2(ranks + 1)
+    ideal = np.cumsum(discounts)
+    cum_discounts = np.concatenate([[0.0], ideal])
+    group_discount = (cum_discounts[last + 1] - cum_discounts[first]) / (last - first + 1)
+    out = {
+        "map": np.where(has_pos, (rel * precision).sum(axis=1) / safe_pos, 0.0),
+        "mrr": np.where(has_pos, 1.0 / (np.argmax(rel, axis=1) + 1), 0.0),
+        "ndcg": np.where(has_pos, (rel * group_discount).sum(axis=1) / ideal[safe_pos - 1], 0.0),
+        "r_precision": np.where(has_pos, hits[np.arange(rows), safe_pos - 1] / safe_pos, 0.0),
+        "roc_auc": _auc(labels, scores),
+    }
+    for k in ks:
+        out[f"p@{k}"] = hits[:, min(k, n) - 1] / k
+    return out
+
+
+# ---------- Public API ----------
+def ranking_metrics(y_true, y_score, ks=DEFAULT_KS):
+    """MAP, MRR, nDCG, R-Precision, ROC-AUC and P@k for every k in `ks`, from one sort."""
+    y_true = np.asarray(y_true).reshape(1, -1)
+    y_score = np.asarray(y_score, dtype=np.float64).reshape(1, -1)
+    if y_true.shape[1] == 0:
+        raise ValueError("ranking_metrics needs at least one document")
+    return {name: float(values[0]) for name, values in _metrics(y_true, y_score, ks).items()}
+
+
+def bootstrap_ci(y_true, y_score, ks=DEFAULT_KS, n_rounds=BOOTSTRAP_ROUNDS, confidence=CONFIDENCE, seed=42):
+    """
+    Percentile bootstrap interval of every ranking metric: {name: (low, high)}.
+    Rounds are resampled and scored as blocks of rows, not one by one.
+    """
+    y_true = np.asarray(y_true)
+    y_score = np.asarray(y_score, dtype=np.float64)
+    n = len(y_true)
+    rng = np.random.default_rng(seed)
+    block = max(1, MAX_BOOTSTRAP_CELLS // max(n, 1))
+
+    samples = {}
+    for start in range(0, n_rounds, block):
+        idx = rng.integers(0, n, size=(min(block, n_rounds - start), n))
+        for name, values in _metrics(y_true[idx], y_score[idx], ks).items():
+            samples.setdefault(name, []).append(values)
+
+    tail = (1.0 - confidence) / 2.0 * 100
+    return {
+        name: tuple(float(v) for v in np.nanpercentile(np.concatenate(parts), [tail, 100 - tail]))
+        for name, parts in samples.items()
+    }
+
+
+def print_ranking_report(y_true, y_score, ks=DEFAULT_KS, n_rounds=BOOTSTRAP_ROUNDS, confidence=CONFIDENCE):
+    """Point estimate and bootstrap interval of every metric, one per line."""
+    point = ranking_metrics(y_true, y_score, ks)
+    ci = bootstrap_ci(y_true, y_score, ks, n_rounds, confidence) if n_rounds else {}
+    for name, value in point.items():
+        line = f"{name.upper()}: {value:.4f}"
+        if name in ci:
+            line += f"  ({confidence:.0%} CI {ci[name][0]:.4f} - {ci[name][1]:.4f})"
+        print(line)
+    return point, ci
@@ -0,0 +1,63 @@
+"""
+Score a table of abstracts with the fine-tuned polyphenol classifier.
+
+    python score_abstracts.py ../data/abstracts.csv scored.csv
+    python score_abstracts.py pool.parquet scored.parquet --threads 8 --batch-size 64
+    python score_abstracts.py pool.parquet scored.parquet --backend onnx
+    python score_abstracts.py pool.parquet scored.parquet --backend int8 --model polyphenol_classifier_final-int8
+
+Adds a `relevance_score` column (softmax probability of class 1) and keeps
+the original row order. Inputs are read in chunks; inside each chunk texts
+are sorted by token length and every batch is padded only to its own
+longest sequence. Reading and tokenizing run in background threads ahead of
+the model (see pipeline.py) and each chunk is written as soon as it is scored.
+"""
+import argparse
+import time
+
+from inference import BACKENDS, BATCH_SIZE, CHUNK_SIZE, MAX_BATCH_TOKENS, MAX_LENGTH, MODEL_DIR, load_model
+from pipeline import PREFETCH, TOKENIZER_THREADS, score_table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch relevance scoring of abstracts (CSV/XLSX/Parquet).")
+    parser.add_argument("input", help="input .csv, .xlsx or .parquet")
+    parser.add_argument("output", help="output .csv, .xlsx or .parquet")
+    parser.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+    parser.add_argument("--text-column", default=None, help="column holding the abstract (default: abstract/text)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-tokens", type=int, default=MAX_BATCH_TOKENS,
+                        help="max padded tokens per batch")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads")
+    parser.add_argument("--tokenizer-threads", type=int, default=TOKENIZER_THREADS,
+                        help="background threads tokenizing upcoming chunks")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH, help="chunks buffered between stages")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="onnx needs the graph exported by onnx_backend.py, int8 a --model written by quantize.py")
+    parser.add_argument("--onnx-path", default=None, help="ONNX file (default: <model>/model.onnx)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tokenizer, model = load_model(args.model, num_threads=args.threads,
+                                  backend=args.backend, onnx_path=args.onnx_path)
+    start = time.perf_counter()
+
+    def progress(n_rows):
+        print(f"Scored {n_rows} rows ({n_rows / (time.perf_counter() - start):.1f} rows/s)")
+
+    n_rows = score_table(
+        tokenizer, model, args.input, args.output, text_column=args.text_column,
+        chunk_size=args.chunk_size, batch_size=args.batch_size, max_tokens=args.max_tokens,
+        max_length=args.max_length, tokenizer_threads=args.tokenizer_threads, prefetch=args.prefetch,
+        on_chunk=progress,
+    )
+
+    print(f"Done: {n_rows} rows in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Local HTTP scoring service with the classifier kept in memory.
+
+    python scoring_service.py --port 8080
+    python scoring_service.py --backend onnx --max-batch 64 --max-wait-ms 5
+
+    curl -s localhost:8080/score -d '{"text": "Dietary flavonoids and ..."}'
+    curl -s localhost:8080/score -d '{"texts": ["...", "..."]}'
+    curl -s localhost:8080/health
+    curl -s localhost:8080/stats
+
+Requests are not scored one by one: every text goes into a bounded queue and a
+single batcher task drains it into padded batches of up to --max-batch texts.
+When requests arrive alone the batcher runs them immediately; once it sees
+concurrent traffic it waits up to --max-wait-ms to fill the batch. A full
+queue answers 503 with Retry-After instead of letting latency grow unbounded.
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web
+
+from inference import BACKENDS, MAX_LENGTH, MODEL_DIR, load_model, score_texts
+
+MAX_BATCH = 32
+MAX_WAIT_MS = 10
+MAX_QUEUE = 1024
+MAX_TEXTS_PER_REQUEST = 256
+# batch-size moving average above which the batcher waits for more arrivals
+CONCURRENCY_EWMA = 1.5
+LATENCY_WINDOW = 10000
+
+
+class MicroBatcher:
+    """Collects queued texts into batches and scores them on one model thread."""
+
+    def __init__(self, tokenizer, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                 max_queue=MAX_QUEUE, max_length=MAX_LENGTH):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_length = max_length
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # one thread: batches run back to back and the event loop stays free
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+        self.started = time.time()
+        self.batch_ewma = 1.0
+        self.n_texts = 0
+        self.n_batches = 0
+        self.n_rejected = 0
+        self.model_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    def has_room(self, n):
+        return self.queue.qsize() + n <= self.queue.maxsize
+
+    async def score(self, texts):
+        """Relevance scores of `texts`; caller checks has_room first."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future, time.perf_counter()))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + (self.max_wait if self.batch_ewma > CONCURRENCY_EWMA else 0)
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                scores = await loop.run_in_executor(
+                    self.executor, lambda: score_texts(self.tokenizer, self.model, texts,
+                                                       batch_size=self.max_batch, max_length=self.max_length))
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            done = time.perf_counter()
+
+            self.model_seconds += done - start
+            self.n_batches += 1
+            self.n_texts += len(batch)
+            self.batch_ewma = 0.8 * self.batch_ewma + 0.2 * len(batch)
+            for (_, future, queued), score in zip(batch, scores):
+                self.latencies.append(done - queued)
+                if not future.done():
+                    future.set_result(float(score))
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        uptime = time.time() - self.started
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {
+            "uptime_s": round(uptime, 1),
+            "texts": self.n_texts,
+            "batches": self.n_batches,
+            "rejected": self.n_rejected,
+            "queued": self.queue.qsize(),
+            "mean_batch_size": round(self.n_texts / self.n_batches, 2) if self.n_batches else 0.0,
+            "texts_per_s": round(self.n_texts / uptime, 2) if uptime else 0.0,
+            "model_texts_per_s": round(self.n_texts / self.model_seconds, 2) if self.model_seconds else 0.0,
+            "latency_ms": {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)},
+        }
+
+
+# ---------- HTTP ----------
+async def handle_score(request):
+    batcher = request.app["batcher"]
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text='expected {"text": str} or {"texts": [str, ...]}')
+    single = "text" in body
+    texts = [body["text"]] if single else body.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        raise web.HTTPBadRequest(text='expected {"text": str} or {"texts": [str, ...]}')
+    if len(texts) > MAX_TEXTS_PER_REQUEST:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_TEXTS_PER_REQUEST, actual_size=len(texts))
+    if not batcher.has_room(len(texts)):
+        batcher.n_rejected += 1
+        raise web.HTTPServiceUnavailable(text="scoring queue full", headers={"Retry-After": "1"})
+
+    scores = await batcher.score(texts)
+    return web.json_response({"score": scores[0]} if single else {"scores": scores})
+
+
+async def handle_health(request):
+    batcher = request.app["batcher"]
+    return web.json_response({
+        "status": "ok",
+        "model": request.app["model_name"],
+        "queued": batcher.queue.qsize(),
+        "queue_capacity": batcher.queue.maxsize,
+    })
+
+
+async def handle_stats(request):
+    return web.json_response(request.app["batcher"].stats())
+
+
+def make_app(tokenizer, model, model_name="", **batcher_kwargs):
+    app = web.Application()
+    app["model_name"] = str(model_name)
+
+    async def on_startup(app):
+        app["batcher"] = MicroBatcher(tokenizer, model, **batcher_kwargs)
+        app["batcher"].start()
+
+    async def on_cleanup(app):
+        await app["batcher"].stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/score", handle_score)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/stats", handle_stats)
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HTTP relevance-scoring service with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--onnx-path", default=None, help="ONNX file (default: <model>/model.onnx)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="texts per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="longest wait for more texts under concurrent load")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="queued texts before answering 503")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tokenizer, model = load_model(args.model, num_threads=args.threads,
+                                  backend=args.backend, onnx_path=args.onnx_path)
+    app = make_app(tokenizer, model, model_name=args.model, max_batch=args.max_batch,
+                   max_wait_ms=args.max_wait_ms, max_queue=args.max_queue, max_length=args.max_length)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
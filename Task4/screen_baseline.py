@@ -0,0 +1,184 @@
+"""
+Screen local PubMed baseline dumps (pubmedNNNNnNNNN.xml.gz) with the classifier.
+
+    python screen_baseline.py /data/pubmed/baseline --output-dir ../data/screening
+    python screen_baseline.py /data/pubmed/baseline/pubmed25n000*.xml.gz --top-k 5000 --backend onnx
+
+Each dump is decompressed and parsed as a stream (eutils.iter_pubmed_articles
+clears every record after use), records with an abstract are scored in
+batches, and the scores are appended to <output-dir>/<dump>.parquet one row
+group per batch. A dump's Parquet file only gets its final name once the dump
+is complete, so a rerun skips finished dumps and restarts an interrupted one.
+The top-K papers over all dumps are kept in a heap and saved to top_k.parquet
+after every dump. Memory does not depend on the size of a dump or of the baseline.
+"""
+import argparse
+import glob
+import gzip
+import heapq
+import sys
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from inference import BACKENDS, BATCH_SIZE, MAX_LENGTH, MODEL_DIR, load_model, score_texts
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from eutils import iter_pubmed_articles  # noqa: E402
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "screening"
+SCORE_BATCH = 512
+TOP_K = 1000
+
+SCHEMA = pa.schema([
+    ("pmid", pa.string()),
+    ("title", pa.string()),
+    ("abstract", pa.string()),
+    ("relevance_score", pa.float32()),
+])
+TOP_K_FILE = "top_k.parquet"
+
+
+def dump_files(inputs):
+    """Expand directories and globs into a sorted list of .xml.gz dumps."""
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(path.glob("*.xml.gz"))
+        else:
+            files.extend(Path(p) for p in glob.glob(item))
+    return sorted(set(files))
+
+
+class TopK:
+    """Min-heap of the k highest-scoring papers seen so far (each PMID once)."""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+        self.pmids = set()
+
+    def push_many(self, pmids, titles, scores):
+        for pmid, title, score in zip(pmids, titles, scores):
+            if pmid in self.pmids:
+                continue
+            item = (float(score), pmid, title)
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, item)
+            elif item > self.heap[0]:
+                self.pmids.discard(heapq.heapreplace(self.heap, item)[1])
+            else:
+                continue
+            self.pmids.add(pmid)
+
+    def save(self, path):
+        rows = sorted(self.heap, reverse=True)
+        table = pa.table({
+            "pmid": [r[1] for r in rows],
+            "title": [r[2] for r in rows],
+            "relevance_score": pa.array([r[0] for r in rows], type=pa.float32()),
+        })
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, k, path):
+        top = cls(k)
+        if path.exists():
+            table = pq.read_table(path, columns=["pmid", "title", "relevance_score"]).to_pydict()
+            top.push_many(table["pmid"], table["title"], table["relevance_score"])
+        return top
+
+
+def screen_dump(path, out_path, tokenizer, model, top, batch_size=SCORE_BATCH, keep_abstract=False,
+                max_length=MAX_LENGTH, model_batch_size=BATCH_SIZE):
+    """Score one dump into out_path (a partial file until the caller renames it); returns (seen, scored)."""
+    writer = pq.ParquetWriter(out_path, SCHEMA)
+    seen = scored = 0
+    batch = []
+
+    def flush():
+        texts = [r["Abstract"] for r in batch]
+        scores = score_texts(tokenizer, model, texts, batch_size=model_batch_size, max_length=max_length)
+        pmids, titles = [r["PMID"] for r in batch], [r["Title"] for r in batch]
+        writer.write_table(pa.table({
+            "pmid": pmids,
+            "title": titles,
+            "abstract": texts if keep_abstract else [None] * len(batch),
+            "relevance_score": pa.array(scores, type=pa.float32()),
+        }, schema=SCHEMA))
+        top.push_many(pmids, titles, scores)
+        batch.clear()
+
+    try:
+        with gzip.open(path, "rb") as f:
+            # plain abstract text, like the training data: no "BACKGROUND: ..." section labels
+            for record in iter_pubmed_articles(f):
+                seen += 1
+                if not record["Abstract"]:
+                    continue
+                batch.append(record)
+                scored += 1
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+    finally:
+        writer.close()
+    return seen, scored
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream-score local PubMed baseline .xml.gz dumps.")
+    parser.add_argument("inputs", nargs="+", help="dump files, globs or directories")
+    parser.add_argument("--output-dir", default=str(OUTPUT_DIR))
+    parser.add_argument("--model", default=str(MODEL_DIR), help="model directory")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--onnx-path", default=None, help="ONNX file (default: <model>/model.onnx)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads")
+    parser.add_argument("--batch-size", type=int, default=SCORE_BATCH, help="records scored together")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--keep-abstract", action="store_true", help="store the abstract text in the output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    files = dump_files(args.inputs)
+    if not files:
+        print("No .xml.gz dumps found.")
+        return
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    top_path = output_dir / TOP_K_FILE
+
+    todo = [f for f in files if not (output_dir / (f.name[:-len(".xml.gz")] + ".parquet")).exists()]
+    print(f"{len(files)} dumps, {len(files) - len(todo)} already screened, {len(todo)} to go")
+    if not todo:
+        return
+
+    tokenizer, model = load_model(args.model, num_threads=args.threads,
+                                  backend=args.backend, onnx_path=args.onnx_path)
+    top = TopK.load(args.top_k, top_path)
+    for path in todo:
+        out_path = output_dir / (path.name[:-len(".xml.gz")] + ".parquet")
+        partial = out_path.with_suffix(".partial")
+        start = time.perf_counter()
+        seen, scored = screen_dump(path, partial, tokenizer, model, top, args.batch_size,
+                                   args.keep_abstract, args.max_length)
+        # top-K first: a crash in between re-screens the dump, and TopK ignores repeated PMIDs
+        top.save(top_path)
+        partial.replace(out_path)
+        elapsed = time.perf_counter() - start
+        print(f"{path.name}: {seen} records, {scored} scored in {elapsed:.1f}s "
+              f"({scored / max(elapsed, 1e-9):.1f}/s); top-{args.top_k} min score "
+              f"{top.heap[0][0] if top.heap else 0:.4f}")
+
+
+if __name__ == "__main__":
+    main()
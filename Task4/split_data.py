@@ -1,40 +1,27 @@
 # python
 import sys
-import pandas as pd
-from sklearn.model_selection import train_test_split
+from pathlib import Path
 
-try:
-    df = pd.read_csv("../data/master_dataset_pulito.csv")
-except FileNotFoundError:
-    print("ERROR: `../data/master_dataset_pulito.csv` not found.")
-    print("Run `prepare_dataset.py` first.")
-    sys.exit(1)
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from stable_split import SplitAssigner, print_split_report, split_dataset  # noqa: E402
 
 TEST_SIZE = 0.15
 VAL_SIZE = 0.15
+RATIOS = {"train": 1.0 - TEST_SIZE - VAL_SIZE, "validation": VAL_SIZE, "test": TEST_SIZE}
 
-X = df['text']
-y = df['label']
-
-X_train_val, X_test, y_train_val, y_test = train_test_split(
-    X, y, test_size=TEST_SIZE, random_state=42, stratify=y
-)
-
-val_proportion = VAL_SIZE / (1.0 - TEST_SIZE)
-
-X_train, X_val, y_train, y_val = train_test_split(
-    X_train_val, y_train_val, test_size=val_proportion, random_state=42, stratify=y_train_val
-)
-
-train_df = pd.DataFrame({'text': X_train, 'label': y_train})
-val_df = pd.DataFrame({'text': X_val, 'label': y_val})
-test_df = pd.DataFrame({'text': X_test, 'label': y_test})
-
-train_df.to_csv("train_set.csv", index=False)
-val_df.to_csv("validation_set.csv", index=False)
-test_df.to_csv("test_set.csv", index=False)
+# Documents keep the split recorded in split_assignments.parquet (the first run adopts the
+# current split files); only new abstracts are assigned, by content hash within per-label quotas.
+assigner = SplitAssigner.load(".", RATIOS)
+try:
+    assigner, written = split_dataset("master_dataset_pulito", output_dir=".", assigner=assigner)
+except FileNotFoundError as e:
+    print(f"ERROR: {e}")
+    print("Run `prepare_dataset.py` first.")
+    sys.exit(1)
+assigner.save(".")
 
 print("Data split completed.")
-print(f"Training documents:   {len(train_df)}")
-print(f"Validation documents: {len(val_df)}")
-print(f"Testing documents:    {len(test_df)}")
+print(f"Training documents:   {written['train']}")
+print(f"Validation documents: {written['validation']}")
+print(f"Testing documents:    {written['test']}")
+print_split_report(assigner, written)
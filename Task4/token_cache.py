@@ -0,0 +1,175 @@
+"""
+Content-addressed tokenization cache shared by Train_model.ipynb and Eval_benchmark.ipynb.
+
+Every text is keyed by a hash of its content; the cache directory itself is
+keyed by a hash of the tokenizer files and max_length, so changing either
+starts a fresh cache. Token ids are appended to flat binary files and read
+back through np.memmap, so a warm run does not tokenize or copy anything;
+only texts never seen before are tokenized and appended.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from training import MAX_LENGTH
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "token_cache"
+TOKENIZER_FILES = ["tokenizer.json", "vocab.txt", "tokenizer_config.json", "special_tokens_map.json"]
+
+INDEX_DTYPE = np.dtype([("hash", "S32"), ("offset", "i8"), ("length", "i4")])
+
+
+def text_hash(text):
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+
+
+def tokenizer_fingerprint(tokenizer, max_length=MAX_LENGTH):
+    """
+    Hash of the tokenizer files (when loaded from a local directory such as
+    polyphenol_classifier_final) or of the vocabulary otherwise, plus max_length.
+    """
+    h = hashlib.sha256(f"{type(tokenizer).__name__}|{max_length}".encode())
+    model_dir = Path(str(tokenizer.name_or_path))
+    files = [model_dir / f for f in TOKENIZER_FILES if (model_dir / f).is_file()]
+    if files:
+        for f in files:
+            h.update(f.name.encode())
+            h.update(f.read_bytes())
+    else:
+        for token, idx in sorted(tokenizer.get_vocab().items(), key=lambda kv: kv[1]):
+            h.update(f"{idx}\t{token}\n".encode("utf-8"))
+        h.update(str(getattr(tokenizer, "do_lower_case", "")).encode())
+    return h.hexdigest()[:16]
+
+
+class TokenCache:
+    """
+    Append-only store of truncated, unpadded token ids:
+
+        <cache_dir>/<fingerprint>/input_ids.bin       int32, all sequences back to back
+        <cache_dir>/<fingerprint>/attention_mask.bin  int8, same layout
+        <cache_dir>/<fingerprint>/index.npy           text hash -> (offset, length)
+    """
+
+    def __init__(self, tokenizer, max_length=MAX_LENGTH, cache_dir=CACHE_DIR):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.dir = Path(cache_dir) / tokenizer_fingerprint(tokenizer, max_length)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.ids_path = self.dir / "input_ids.bin"
+        self.mask_path = self.dir / "attention_mask.bin"
+        self.index_path = self.dir / "index.npy"
+
+        if self.index_path.exists():
+            self.index = np.load(self.index_path)
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.rows = {h: i for i, h in enumerate(self.index["hash"].tolist())}
+        self._ids = self._mask = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def _tokens_used(self):
+        if len(self.index) == 0:
+            return 0
+        last = self.index[-1]
+        return int(last["offset"] + last["length"])
+
+    def _append(self, texts, hashes):
+        """Tokenize `texts`, append them to the data files, then publish the new index."""
+        enc = self.tokenizer(list(texts), truncation=True, max_length=self.max_length, padding=False)
+        offset = self._tokens_used()
+        entries = np.zeros(len(texts), dtype=INDEX_DTYPE)
+        with open(self.ids_path, "r+b" if self.ids_path.exists() else "wb") as f_ids, \
+                open(self.mask_path, "r+b" if self.mask_path.exists() else "wb") as f_mask:
+            # anything past the indexed tokens is a leftover of an interrupted append
+            f_ids.seek(offset * 4)
+            f_ids.truncate()
+            f_mask.seek(offset)
+            f_mask.truncate()
+            for i, (ids, mask) in enumerate(zip(enc["input_ids"], enc["attention_mask"])):
+                f_ids.write(np.asarray(ids, dtype=np.int32).tobytes())
+                f_mask.write(np.asarray(mask, dtype=np.int8).tobytes())
+                entries[i] = (hashes[i], offset, len(ids))
+                offset += len(ids)
+
+        self.index = np.concatenate([self.index, entries])
+        tmp = self.dir / "index.tmp.npy"
+        np.save(tmp, self.index)
+        os.replace(tmp, self.index_path)
+        for i, h in enumerate(hashes):
+            self.rows[h] = len(self.index) - len(hashes) + i
+        self._ids = self._mask = None
+
+    def _maps(self):
+        if self._ids is None and self._tokens_used():
+            n = self._tokens_used()
+            self._ids = np.memmap(self.ids_path, dtype=np.int32, mode="r", shape=(n,))
+            self._mask = np.memmap(self.mask_path, dtype=np.int8, mode="r", shape=(n,))
+        return self._ids, self._mask
+
+    def lookup(self, texts):
+        """
+        Cache rows for `texts`, tokenizing only the ones not cached yet.
+        Returns (rows, number of newly tokenized texts).
+        """
+        hashes = [text_hash(t) for t in texts]
+        missing = {}
+        for t, h in zip(texts, hashes):
+            if h not in self.rows and h not in missing:
+                missing[h] = t
+        if missing:
+            self._append(list(missing.values()), list(missing.keys()))
+        return np.array([self.rows[h] for h in hashes], dtype=np.int64), len(missing)
+
+    def get(self, row):
+        """(input_ids, attention_mask) of one cache row as memmap views, no copy."""
+        ids, mask = self._maps()
+        entry = self.index[row]
+        start, end = int(entry["offset"]), int(entry["offset"] + entry["length"])
+        return ids[start:end], mask[start:end]
+
+
+class CachedTokenDataset(torch.utils.data.Dataset):
+    """Map-style dataset over TokenCache rows; usable by Trainer + DataCollatorWithPadding."""
+
+    def __init__(self, cache, rows, labels=None):
+        self.cache = cache
+        self.rows = rows
+        self.labels = None if labels is None else np.asarray(labels)
+        self.lengths = cache.index["length"][rows].tolist()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        ids, mask = self.cache.get(self.rows[i])
+        item = {"input_ids": ids, "attention_mask": mask}
+        if self.labels is not None:
+            item["labels"] = int(self.labels[i])
+        return item
+
+
+def tokenize_cached(ds, tokenizer, max_length=MAX_LENGTH, cache_dir=CACHE_DIR, verbose=True):
+    """
+    Cached replacement for training.tokenize_dataset. Accepts a datasets.Dataset
+    or DatasetDict with 'text' (and optionally 'label'); returns the same shape
+    with CachedTokenDataset values.
+    """
+    cache = TokenCache(tokenizer, max_length, cache_dir)
+
+    def convert(name, split):
+        texts = ["" if t is None else str(t) for t in split["text"]]
+        labels = split["label"] if "label" in split.column_names else None
+        rows, new = cache.lookup(texts)
+        if verbose:
+            print(f"{name}: {len(texts)} texts, {new} newly tokenized")
+        return CachedTokenDataset(cache, rows, labels)
+
+    if hasattr(ds, "column_names") and isinstance(ds.column_names, list):
+        return convert("dataset", ds)
+    return {name: convert(name, split) for name, split in ds.items()}
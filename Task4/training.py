@@ -0,0 +1,127 @@
+"""
+Shared fine-tuning / evaluation code for Train_model.ipynb and Eval_benchmark.ipynb.
+
+Texts are tokenized without padding; DataCollatorWithPadding pads every batch
+only to its own longest sequence, and group_by_length makes the Trainer put
+examples of similar length in the same batch (train and eval). Metrics do not
+depend on batch composition, so they are the same as with max_length padding.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from datasets import Dataset, DatasetDict
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from transformers import DataCollatorWithPadding, Trainer, TrainingArguments
+from transformers.trainer_pt_utils import LengthGroupedSampler
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import read_dataset  # noqa: E402
+
+MODEL_NAME = "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract"
+MAX_LENGTH = 512
+BATCH_SIZE = 8
+
+
+# ---------- Data ----------
+def read_split(name, data_dir="."):
+    """DataFrame(text, label) of one split written by split_data.py; only those two columns are read."""
+    df = read_dataset(f"{name}_set", columns=["abstract", "label"], data_dir=data_dir)
+    df = df.dropna(subset=["abstract", "label"]).reset_index(drop=True)
+    return df.rename(columns={"abstract": "text"}).astype({"label": "int64"})
+
+
+def load_splits(data_dir="."):
+    """train/validation/test splits written by split_data.py as a DatasetDict."""
+    return DatasetDict({
+        name: Dataset.from_pandas(read_split(name, data_dir), preserve_index=False)
+        for name in ("train", "validation", "test")
+    })
+
+
+def tokenize_dataset(ds, tokenizer, max_length=MAX_LENGTH):
+    """Tokenize the 'text' column with truncation only (no padding) and drop it."""
+    def tokenize_function(examples):
+        return tokenizer(examples['text'], truncation=True, max_length=max_length)
+
+    return ds.map(tokenize_function, batched=True, remove_columns=["text"])
+
+
+# ---------- Metrics ----------
+def compute_metrics(eval_pred):
+    logits, labels = eval_pred
+    predictions = np.argmax(logits, axis=-1)
+
+    return {
+        'accuracy': accuracy_score(labels, predictions),
+        'f1': f1_score(labels, predictions, average='binary'),
+        'precision': precision_score(labels, predictions, average='binary'),
+        'recall': recall_score(labels, predictions, average='binary'),
+    }
+
+
+def softmax_scores(logits):
+    """Softmax probability of class 1."""
+    return torch.softmax(torch.tensor(logits), dim=1)[:, 1].numpy()
+
+
+# ---------- Trainer ----------
+def make_training_args(output_dir, **kwargs):
+    """TrainingArguments with length-grouped batching; kwargs override anything."""
+    params = dict(
+        output_dir=output_dir,
+        per_device_train_batch_size=BATCH_SIZE,
+        per_device_eval_batch_size=BATCH_SIZE,
+        group_by_length=True,
+        report_to="none",
+    )
+    params.update(kwargs)
+    return TrainingArguments(**params)
+
+
+def make_trainer(model, tokenizer, args, train_dataset=None, eval_dataset=None):
+    """Trainer that pads each batch dynamically."""
+    return Trainer(
+        model=model,
+        args=args,
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
+        compute_metrics=compute_metrics,
+        processing_class=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer),
+    )
+
+
+# ---------- Padding report ----------
+def padding_report(dataset, batch_size=BATCH_SIZE, max_length=MAX_LENGTH, seed=42):
+    """
+    Tokens fed to the model with max_length padding vs. length-grouped dynamic
+    padding, using the same LengthGroupedSampler the Trainer uses.
+    """
+    lengths = getattr(dataset, "lengths", None) or [len(ids) for ids in dataset['input_ids']]
+    if not lengths:
+        return {"real_tokens": 0, "max_length_tokens": 0, "dynamic_tokens": 0, "saved_fraction": 0.0}
+    generator = torch.Generator().manual_seed(seed)
+    order = list(LengthGroupedSampler(batch_size, lengths=lengths, generator=generator))
+
+    dynamic = 0
+    for start in range(0, len(order), batch_size):
+        batch = [lengths[i] for i in order[start:start + batch_size]]
+        dynamic += max(batch) * len(batch)
+    fixed = max_length * len(lengths)
+
+    return {
+        "real_tokens": int(sum(lengths)),
+        "max_length_tokens": fixed,
+        "dynamic_tokens": dynamic,
+        "saved_fraction": 1.0 - dynamic / fixed,
+    }
+
+
+def print_padding_report(name, dataset, batch_size=BATCH_SIZE, max_length=MAX_LENGTH):
+    r = padding_report(dataset, batch_size, max_length)
+    print(f"{name}: {r['dynamic_tokens']:,} tokens with dynamic padding vs "
+          f"{r['max_length_tokens']:,} with max_length={max_length} "
+          f"({r['saved_fraction']:.1%} saved, {r['real_tokens']:,} real tokens)")
+    return r
@@ -1,130 +1,131 @@
 # python
 import pandas as pd
-from sklearn.model_selection import train_test_split
 import sys
 import numpy as np
+import time
+from pathlib import Path
 
-MASTER_FILE = "../data/master_dataset_pulito.csv"
-BENCHMARK_FILE = "../data/benchmark.xlsx"
-RANDOM_STATE = 42
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from dataset import read_dataset  # noqa: E402
+from near_duplicates import NearDuplicateIndex  # noqa: E402
+from stable_split import SplitAssigner, print_split_report, split_dataset  # noqa: E402
+
+MASTER_DATASET = "master_dataset_pulito"
+BENCHMARK_DATASET = "benchmark"
+
+# master documents this similar (word 3-shingle Jaccard) to a benchmark abstract go to test
+JACCARD_THRESHOLD = 0.5
+# ... and so do master documents sharing this much of the shorter text's shingles with one
+CONTAINMENT_THRESHOLD = 0.8
+LEAKAGE_REPORT = "leakage_report.csv"
 
 TEST_RATIO = 0.15
 VAL_RATIO = 0.15
 TRAIN_RATIO = 1.0 - TEST_RATIO - VAL_RATIO
+RATIOS = {"train": TRAIN_RATIO, "validation": VAL_RATIO, "test": TEST_RATIO}
 
 try:
-    df_master = pd.read_csv(MASTER_FILE)
-except FileNotFoundError:
-    print(f"ERROR: File {MASTER_FILE} not found.")
-    sys.exit(1)
-
-try:
-    df_benchmark = pd.read_excel(BENCHMARK_FILE)
-except FileNotFoundError:
-    print(f"ERROR: File {BENCHMARK_FILE} not found.")
+    df_benchmark = read_dataset(BENCHMARK_DATASET, columns=["title", "abstract"])
+except FileNotFoundError as e:
+    print(f"ERROR: {e}")
     sys.exit(1)
 except ImportError:
-    print("ERROR: To read .xlsx files the 'openpyxl' library is required.")
+    print("ERROR: To import the legacy .xlsx benchmark the 'openpyxl' library is required.")
     print("Run: pip install openpyxl")
     sys.exit(1)
 
-if 'abstract' not in df_benchmark.columns:
-    print(f"ERROR: The column 'abstract' was not found in {BENCHMARK_FILE}.")
-    sys.exit(1)
-
 benchmark_texts = set(df_benchmark['abstract'].dropna())
 
-is_benchmark_row = (df_master['label'] == 1) & (df_master['text'].isin(benchmark_texts))
-
-df_forced_test = df_master[is_benchmark_row].copy()
-df_splittable = df_master[~is_benchmark_row].copy()
-
-if len(df_forced_test) == 0:
-    print("WARNING: No relevant (label 1) benchmark documents were found in the master dataset.")
-elif len(df_forced_test) > len(benchmark_texts):
-    print("WARNING: Duplicates found in the master dataset that match the benchmark.")
-
-
-
-total_docs = len(df_master)
-target_val_size = int(total_docs * VAL_RATIO)
-target_test_size = int(total_docs * TEST_RATIO)
-
-num_val_needed = target_val_size
-num_test_needed = max(0, target_test_size - len(df_forced_test))
-
-num_train_needed = len(df_splittable) - num_val_needed - num_test_needed
-
-if num_train_needed <= 0:
-    print(f"ERROR: Insufficient data. With {len(df_splittable)} splittable documents it is not possible to create a train set")
-    print(f"after allocating {num_val_needed} for validation and {num_test_needed} for test.")
+# Exact matches miss copies that differ by whitespace, HTML or truncation (Scholar snippets):
+# every master document within JACCARD_THRESHOLD of a benchmark abstract, or containing / contained
+# in one at CONTAINMENT_THRESHOLD, is forced into test.
+index = NearDuplicateIndex(threshold=JACCARD_THRESHOLD, containment=CONTAINMENT_THRESHOLD)
+index.add_many(df_benchmark.index, df_benchmark['abstract'])
+
+leakage_rows = []
+rows_seen = 0
+
+
+def forced_test(df):
+    """Flag the batch rows that near-duplicate a benchmark abstract and record them for the report."""
+    global rows_seen
+    forced = np.zeros(len(df), dtype=bool)
+    for i, text in enumerate(df['abstract']):
+        for benchmark_row, score, contained in index.query(text):
+            forced[i] = True
+            leakage_rows.append({
+                'master_row': rows_seen + i,
+                'benchmark_row': benchmark_row,
+                'jaccard': score,
+                'containment': contained,
+                'indice': df['indice'].iat[i],
+                'pmid': df['pmid'].iat[i],
+                'label': df['label'].iat[i],
+                'benchmark_title': df_benchmark.at[benchmark_row, 'title'],
+                'exact': text == df_benchmark.at[benchmark_row, 'abstract'],
+            })
+    rows_seen += len(df)
+    return forced
+
+
+# Documents keep the split recorded in split_assignments.parquet (the first run adopts the current
+# split files); new abstracts are assigned by content hash within per-label quotas, and benchmark
+# near duplicates always go to test. The master dataset is streamed batch by batch.
+start = time.perf_counter()
+assigner = SplitAssigner.load(".", RATIOS)
+try:
+    assigner, written = split_dataset(MASTER_DATASET, output_dir=".", assigner=assigner, forced_test=forced_test)
+except FileNotFoundError as e:
+    print(f"ERROR: {e}")
     sys.exit(1)
+assigner.save(".")
+print(f"Split {rows_seen} documents against {len(index.keys)} benchmark abstracts "
+      f"in {time.perf_counter() - start:.1f}s ({index.bands} LSH bands x {index.rows} rows, "
+      f"{index.containment_bands} x {index.containment_rows} for containment)")
+
+leakage = pd.DataFrame(leakage_rows, columns=['master_row', 'benchmark_row', 'jaccard', 'containment', 'indice',
+                                              'pmid', 'label', 'benchmark_title', 'exact'])
+# least similar first: those are the matches worth reviewing by hand
+leakage = leakage.sort_values(['jaccard', 'master_row'])
+leakage.to_csv(LEAKAGE_REPORT, index=False)
+
+n_forced = leakage['master_row'].nunique()
+print(f"\nLEAKAGE REPORT ({LEAKAGE_REPORT}):")
+print(f"  master documents matching a benchmark abstract: {n_forced} "
+      f"({leakage.loc[leakage['exact'], 'master_row'].nunique()} exact, "
+      f"{leakage.loc[~leakage['exact'].astype(bool), 'master_row'].nunique()} near duplicates only)")
+print(f"  benchmark abstracts with a copy in the master dataset: {leakage['benchmark_row'].nunique()}")
+print(f"  by label: {leakage.drop_duplicates('master_row')['label'].value_counts().to_dict()}")
+if len(leakage):
+    print(f"  lowest Jaccard forced into test: {leakage['jaccard'].min():.3f} "
+          f"({(leakage['jaccard'] < JACCARD_THRESHOLD).sum()} matches by containment only)")
+
+if n_forced == 0:
+    print("WARNING: No benchmark documents were found in the master dataset.")
+elif n_forced > leakage['benchmark_row'].nunique():
+    print("WARNING: Duplicates found in the master dataset that match the benchmark.")
 
-val_test_pool_size = num_val_needed + num_test_needed
-
-if len(df_splittable) == 0:
-    val_test_ratio = 0
-else:
-    val_test_ratio = val_test_pool_size / len(df_splittable)
-
-if val_test_ratio >= 1.0:
-    df_train = pd.DataFrame(columns=df_master.columns)
-    df_val_test_pool = df_splittable
-else:
-    df_train, df_val_test_pool = train_test_split(
-        df_splittable,
-        test_size=val_test_ratio,
-        random_state=RANDOM_STATE,
-        stratify=df_splittable['label']
-    )
-
-if (num_val_needed + num_test_needed) > 0 and len(df_val_test_pool) > 0:
-    test_needed_ratio = num_test_needed / (num_val_needed + num_test_needed)
-
-    if test_needed_ratio == 0:
-        df_val = df_val_test_pool
-        df_test_needed = pd.DataFrame(columns=df_master.columns)
-    elif test_needed_ratio == 1:
-        df_val = pd.DataFrame(columns=df_master.columns)
-        df_test_needed = df_val_test_pool
-    elif len(df_val_test_pool) < 2 or len(np.unique(df_val_test_pool['label'])) < 2:
-        df_val, df_test_needed = train_test_split(
-            df_val_test_pool,
-            test_size=test_needed_ratio,
-            random_state=RANDOM_STATE
-        )
-    else:
-        df_val, df_test_needed = train_test_split(
-            df_val_test_pool,
-            test_size=test_needed_ratio,
-            random_state=RANDOM_STATE,
-            stratify=df_val_test_pool['label']
-        )
-else:
-    df_val = pd.DataFrame(columns=df_master.columns)
-    df_test_needed = pd.DataFrame(columns=df_master.columns)
-
-df_test_final = pd.concat([df_forced_test, df_test_needed], ignore_index=True)
-df_train_final = df_train
-df_val_final = df_val
+print()
+print_split_report(assigner, written)
 
-df_train_final.to_csv("train_set.csv", index=False)
-df_val_final.to_csv("validation_set.csv", index=False)
-df_test_final.to_csv("test_set.csv", index=False)
 
 
+df_train_final = read_dataset("train_set", columns=["abstract"], data_dir=".")
+df_val_final = read_dataset("validation_set", columns=["abstract"], data_dir=".")
 
-train_texts = set(df_train_final['text'])
-val_texts = set(df_val_final['text'])
+train_texts = set(df_train_final['abstract'])
+val_texts = set(df_val_final['abstract'])
 
 benchmark_violations = 0
 for text in benchmark_texts:
     if text in train_texts or text in val_texts:
         benchmark_violations += 1
+# the written splits are searched again, independently of the assignment above
+benchmark_violations += len(index.find(pd.concat([df_train_final, df_val_final])['abstract']))
 
 if benchmark_violations == 0:
     print("\nSAFETY CHECK: OK!")
-    print("No benchmark document is present in `train_set.csv` or `validation_set.csv`.")
+    print("No benchmark document or near duplicate is present in `train_set` or `validation_set`.")
 else:
     print("\nSAFETY CHECK: FAILED!")
     print(f"Found {benchmark_violations} benchmark violations in train/validation.")
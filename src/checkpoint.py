@@ -0,0 +1,79 @@
+import json
+import sqlite3
+import time
+
+import pandas as pd
+
+from dataset import DATA_DIR
+
+CHECKPOINT_PATH = DATA_DIR / "checkpoint.sqlite"
+
+
+class CheckpointStore:
+    """
+    Append-only journal of per-row results, keyed by (source, indice).
+
+    Each result is one INSERT, so saving progress costs the same no matter how
+    big the dataset is. The final dataset is written once at the end with
+    `apply` (fill an existing frame) or `to_frame` (build a new one), and a
+    restarted run resumes exactly from `done()`.
+    """
+
+    def __init__(self, source, path=CHECKPOINT_PATH):
+        self.source = source
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                source TEXT,
+                indice TEXT,
+                data TEXT,
+                updated REAL,
+                PRIMARY KEY (source, indice)
+            )
+        """)
+        self._conn.commit()
+
+    def record(self, indice, **fields):
+        """Journal the result for one row; a second record for the same row replaces the first."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (self.source, str(indice), json.dumps(fields, default=str), time.time()))
+        self._conn.commit()
+
+    def done(self):
+        """Indices (as strings) already processed by this source."""
+        rows = self._conn.execute("SELECT indice FROM results WHERE source = ?", (self.source,))
+        return {r[0] for r in rows}
+
+    def results(self):
+        """Dict indice -> recorded fields, in insertion order."""
+        rows = self._conn.execute(
+            "SELECT indice, data FROM results WHERE source = ? ORDER BY rowid", (self.source,))
+        return {indice: json.loads(data) for indice, data in rows}
+
+    def apply(self, df, key="indice"):
+        """
+        Copy every non-empty journaled field into the matching row of `df` (in place).
+        With key=None rows are matched on the index instead of a column.
+        """
+        keys = df.index if key is None else df[key]
+        positions = {str(v): label for label, v in zip(df.index, keys)}
+        for indice, fields in self.results().items():
+            label = positions.get(indice)
+            if label is None:
+                continue
+            for col, value in fields.items():
+                if value is not None and value != "":
+                    df.at[label, col] = value
+        return df
+
+    def to_frame(self, key="indice"):
+        """All journaled rows as a DataFrame with `key` as a column."""
+        rows = [dict(fields, **{key: indice}) for indice, fields in self.results().items()]
+        return pd.DataFrame(rows)
+
+    def close(self):
+        self._conn.close()
@@ -1,20 +1,9 @@
-import pandas as pd
+from dataset import read_dataset
 
-df = pd.read_csv(
-    "../data/abstracts.csv",
-    quoting=1,             
-    escapechar="\\",        
-    on_bad_lines="skip",    # prevent crash if one row is malformed
-    engine="python"         
-)
+# only the abstract column is read from the Parquet files
+df = read_dataset("abstracts", columns=["abstract"])
 
-df1 = pd.read_csv(
-    "../data/abstracts_filled.csv",
-    quoting=1,             
-    escapechar="\\",        
-    on_bad_lines="skip",    # prevent crash if one row is malformed
-    engine="python"         
-)
+df1 = read_dataset("abstracts_filled", columns=["abstract"])
 
 
 count_non_empty = df['abstract'].notna() & (df['abstract'].str.strip() != "")
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from dataset import DATA_DIR
+from http_client import map_concurrent
+from title_match import best_match, normalize_title
+
+CROSSREF_URL = "https://api.crossref.org/works"
+DOI_CACHE_PATH = DATA_DIR / "doi_cache.sqlite"
+
+# candidates scored per title instead of blindly taking rows=1
+CANDIDATES = 5
+MATCH_THRESHOLD = 0.9
+# "no DOI for this title" is retried after this many seconds
+NEGATIVE_TTL = 14 * 24 * 3600
+# optional: CrossRef's polite pool is faster and more stable for identified clients
+MAILTO = os.environ.get("CROSSREF_MAILTO", "")
+
+
+def title_key(title):
+    return normalize_title(title)
+
+
+def best_candidate(title, items, threshold=MATCH_THRESHOLD):
+    """Return (doi, score) of the best-matching CrossRef item, or (None, best score)."""
+    dois, candidates = [], []
+    for item in items:
+        for candidate in item.get("title") or []:
+            dois.append(item.get("DOI"))
+            candidates.append(candidate)
+    pos, score = best_match(title, candidates, threshold)
+    return (dois[pos] if pos is not None else None), score
+
+
+class DoiResolver:
+    """
+    Title -> DOI through CrossRef, persisted in SQLite.
+
+    Hits are kept forever, misses for NEGATIVE_TTL. Concurrent lookups of the
+    same title share one request, so two sources asking for the same DOI cost
+    a single CrossRef call.
+    """
+
+    def __init__(self, path=DOI_CACHE_PATH, candidates=CANDIDATES,
+                 threshold=MATCH_THRESHOLD, negative_ttl=NEGATIVE_TTL):
+        self.candidates = candidates
+        self.threshold = threshold
+        self.negative_ttl = negative_ttl
+        self._inflight = {}
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dois (
+                title_key TEXT PRIMARY KEY,
+                doi TEXT,
+                score REAL,
+                created REAL
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, title):
+        """Cached answer: (True, doi-or-None) if known and fresh, else (False, None)."""
+        row = self._conn.execute(
+            "SELECT doi, created FROM dois WHERE title_key = ?", (title_key(title),)).fetchone()
+        if row is None:
+            return False, None
+        doi, created = row
+        if doi is None and time.time() - created > self.negative_ttl:
+            return False, None
+        return True, doi
+
+    def store(self, title, doi, score):
+        self._conn.execute("INSERT OR REPLACE INTO dois VALUES (?, ?, ?, ?)",
+                           (title_key(title), doi, score, time.time()))
+        self._conn.commit()
+
+    async def _query(self, client, title):
+        params = {"query.title": title, "rows": self.candidates, "select": "DOI,title"}
+        if MAILTO:
+            params["mailto"] = MAILTO
+        data = await client.get_json(CROSSREF_URL, params=params)
+        if data is None:
+            # network/API failure: do not remember it as a miss
+            return None
+        items = data.get("message", {}).get("items", [])
+        doi, score = best_candidate(title, items, self.threshold)
+        self.store(title, doi, score)
+        return doi
+
+    async def resolve(self, client, title):
+        known, doi = self.lookup(title)
+        if known:
+            return doi
+        key = title_key(title)
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.ensure_future(self._query(client, title))
+        try:
+            return await self._inflight[key]
+        finally:
+            self._inflight.pop(key, None)
+
+    async def resolve_many(self, client, titles, concurrency=10):
+        """Resolve many titles concurrently; returns {title: doi or None}."""
+        results = {}
+        async for title, doi in map_concurrent(lambda t: self.resolve(client, t), titles, concurrency):
+            results[title] = doi
+        return results
+
+    def close(self):
+        self._conn.close()
+
+
+_default_resolver = None
+
+
+def default_resolver():
+    """Process-wide resolver, so every fetcher shares one cache and one set of in-flight lookups."""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = DoiResolver()
+    return _default_resolver
+
+
+async def crossref_doi(client, title):
+    """Search DOI by title using CrossRef."""
+    return await default_resolver().resolve(client, title)
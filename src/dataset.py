@@ -0,0 +1,215 @@
+"""
+Parquet dataset layer shared by the collection scripts (src/) and the model code (Task4/, Task5/).
+
+    python dataset.py info
+    python dataset.py import abstracts master_dataset_pulito
+    python dataset.py export abstracts_filled --format xlsx
+
+Every table of the pipeline (publications, abstracts, non-relevant papers, the
+master dataset, the splits, the benchmark) is a <name>.parquet file with the
+same core columns (SCHEMA) first, followed by whatever extra columns the table
+has (authors, year_of_publication, ...). Readers ask only for the columns they
+need and get them without parsing the rest of the file.
+
+The first read of a dataset that has no Parquet file yet imports the legacy
+<name>.csv / <name>.xlsx once. CSV files are read with the C parser; a file it
+cannot parse is an error, never a silently shorter table. Writing CSV or XLSX
+is an explicit final step (`export` here, or write_dataset(..., export="xlsx")).
+"""
+import argparse
+import math
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+SCHEMA = pa.schema([
+    ("indice", pa.int64()),
+    ("pmid", pa.string()),
+    ("doi", pa.string()),
+    ("title", pa.string()),
+    ("abstract", pa.string()),
+    ("source", pa.string()),
+    ("label", pa.int8()),
+])
+COLUMNS = SCHEMA.names
+TEXT_COLUMNS = ["pmid", "doi", "title", "abstract", "source"]
+
+# column names used by the legacy files and by eutils records
+ALIASES = {"Title": "title", "PMID": "pmid", "Abstract": "abstract", "DOI": "doi", "text": "abstract",
+           "Journal": "journal_name", "Year": "year_of_publication"}
+# what read_csv used to turn into NaN; the fetch scripts also journal "NA" for misses
+NA_VALUES = {"", "NA", "N/A", "NaN", "nan", "None", "null", "<NA>"}
+LEGACY_FORMATS = ("csv", "xlsx")
+
+
+# ---------- Schema ----------
+def _clean_text(value, integral=False):
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if integral and isinstance(value, float) and value.is_integer():
+        # PMIDs come back as floats from CSV columns with gaps
+        value = int(value)
+    value = str(value)
+    return None if value.strip() in NA_VALUES else value
+
+
+def normalize(df):
+    """
+    Copy of `df` in the dataset schema: legacy column names renamed, missing core
+    columns added (indice defaults to the row position), core columns typed and
+    first, extra columns kept after them.
+    """
+    df = df.rename(columns={k: v for k, v in ALIASES.items() if k in df.columns and v not in df.columns})
+    df = df.reset_index(drop=True)
+    if "indice" not in df.columns:
+        df["indice"] = range(len(df))
+    for col in TEXT_COLUMNS:
+        values = df[col] if col in df.columns else [None] * len(df)
+        df[col] = pd.Series([_clean_text(v, integral=col == "pmid") for v in values], index=df.index, dtype=object)
+    df["indice"] = pd.to_numeric(df["indice"]).astype("Int64")
+    df["label"] = pd.to_numeric(df["label"]).astype("Int8") if "label" in df.columns else pd.array(
+        [pd.NA] * len(df), dtype="Int8")
+
+    extra = [c for c in df.columns if c not in COLUMNS]
+    for col in extra:
+        if df[col].dtype == object:
+            # mixed-type Excel columns (e.g. journal_issue) have no single Arrow type
+            df[col] = [None if pd.isna(v) else str(v) for v in df[col]]
+    return df[COLUMNS + extra]
+
+
+def to_arrow(df):
+    table = pa.Table.from_pandas(normalize(df), preserve_index=False)
+    for i, field in enumerate(SCHEMA):
+        table = table.set_column(i, field, table.column(i).cast(field.type))
+    return table
+
+
+# ---------- Files ----------
+def dataset_path(name, data_dir=DATA_DIR):
+    return Path(data_dir) / f"{name}.parquet"
+
+
+def legacy_path(name, data_dir=DATA_DIR):
+    """The <name>.csv or <name>.xlsx this dataset replaces, or None."""
+    for fmt in LEGACY_FORMATS:
+        path = Path(data_dir) / f"{name}.{fmt}"
+        if path.exists():
+            return path
+    return None
+
+
+def read_legacy(path):
+    """A CSV/XLSX file as a raw DataFrame; a CSV the C parser cannot read raises instead of losing rows."""
+    path = Path(path)
+    if path.suffix in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    try:
+        return pd.read_csv(path)
+    except pd.errors.ParserError:
+        # abstracts.csv used to be written with QUOTE_ALL and backslash escapes
+        return pd.read_csv(path, escapechar="\\")
+
+
+def read_table(path, columns=None):
+    """Any .parquet/.csv/.xlsx table in the dataset schema, projected to `columns`."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return read_dataset(path.stem, columns, path.parent)
+    df = normalize(read_legacy(path))
+    return df if columns is None else df[columns]
+
+
+def read_dataset(name, columns=None, data_dir=DATA_DIR):
+    """
+    Dataset `name` from <data_dir>/<name>.parquet, only the requested columns.
+    A missing Parquet file is imported once from the legacy CSV/XLSX.
+    """
+    path = dataset_path(name, data_dir)
+    if not path.exists():
+        legacy = legacy_path(name, data_dir)
+        if legacy is None:
+            raise FileNotFoundError(f"No dataset {path} and no {name}.csv/.xlsx to import in {data_dir}")
+        import_legacy(name, data_dir)
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def write_dataset(df, name, data_dir=DATA_DIR, export=None):
+    """
+    Save `df` as dataset `name` (atomically: readers never see half a file).
+    export="csv" or "xlsx" also writes the legacy file next to it.
+    """
+    path = dataset_path(name, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = to_arrow(df)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    tmp.replace(path)
+    if export:
+        export_dataset(name, export, data_dir)
+    return path
+
+
+def import_legacy(name, data_dir=DATA_DIR):
+    """(Re)build <name>.parquet from <name>.csv/.xlsx; returns the number of rows."""
+    legacy = legacy_path(name, data_dir)
+    if legacy is None:
+        raise FileNotFoundError(f"No {name}.csv/.xlsx in {data_dir}")
+    df = read_legacy(legacy)
+    write_dataset(df, name, data_dir)
+    return len(df)
+
+
+def export_dataset(name, fmt="csv", data_dir=DATA_DIR, output=None):
+    """Write dataset `name` as CSV or XLSX (default <data_dir>/<name>.<fmt>)."""
+    if fmt not in LEGACY_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {LEGACY_FORMATS}")
+    output = Path(output) if output else Path(data_dir) / f"{name}.{fmt}"
+    df = read_dataset(name, data_dir=data_dir)
+    if fmt == "csv":
+        df.to_csv(output, index=False)
+    else:
+        df.to_excel(output, index=False)
+    return output
+
+
+# ---------- CLI ----------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parquet datasets of the pipeline.")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("info", help="rows and columns of every dataset")
+
+    imp = sub.add_parser("import", help="rebuild datasets from their legacy CSV/XLSX files")
+    imp.add_argument("names", nargs="*", help="default: every CSV/XLSX in the data dir")
+
+    exp = sub.add_parser("export", help="write a dataset as CSV or XLSX")
+    exp.add_argument("name")
+    exp.add_argument("--format", choices=LEGACY_FORMATS, default="csv")
+    exp.add_argument("--output", default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    data_dir = Path(args.data_dir)
+    if args.command == "info":
+        for path in sorted(data_dir.glob("*.parquet")):
+            meta = pq.read_metadata(path)
+            print(f"{path.stem:<35} {meta.num_rows:>8} rows  {path.stat().st_size / 1e6:7.2f} MB  "
+                  f"{', '.join(meta.schema.names)}")
+    elif args.command == "import":
+        names = args.names or sorted({p.stem for fmt in LEGACY_FORMATS for p in data_dir.glob(f"*.{fmt}")})
+        for name in names:
+            print(f"{name}: {import_legacy(name, data_dir)} rows -> {dataset_path(name, data_dir)}")
+    else:
+        print(f"Exported {args.name} -> {export_dataset(args.name, args.format, data_dir, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
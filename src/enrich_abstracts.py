@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+
+import pandas as pd
+
+import task1_alex
+import task1_elsevier
+import task1_europePMC
+import task1_pubmed
+import task1_semantic_scholar
+from checkpoint import CheckpointStore
+from dataset import read_dataset, write_dataset
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient
+
+DATASET = "abstracts"
+# Rows no source could fill are journaled too; set to True to send them through again
+RETRY_MISSES = False
+
+DONE = object()
+
+
+# ---------- Stage adapters: title -> abstract or None ----------
+async def pubmed_abstract(client, title):
+    record = await task1_pubmed.try_pubmed_queries(client, title)
+    return record["Abstract"] if record else None
+
+
+async def europepmc_abstract(client, title):
+    return await task1_europePMC.fetch_abstract(client, task1_europePMC.sanitize_title(title))
+
+
+async def openalex_abstract(client, title):
+    return await task1_alex.fetch_abstract(client, title)
+
+
+async def semantic_scholar_abstract(client, title):
+    return await task1_semantic_scholar.semantic_scholar_abstract(client, title)
+
+
+async def scopus_abstract(client, title):
+    abstract, _ = await task1_elsevier.fetch_abstract(client, title)
+    return abstract
+
+
+# (source name, fetch function, titles in flight), in waterfall order
+STAGES = [
+    ("pubmed", pubmed_abstract, task1_pubmed.CONCURRENCY),
+    ("europepmc", europepmc_abstract, task1_europePMC.CONCURRENCY),
+    ("openalex", openalex_abstract, task1_alex.CONCURRENCY),
+    ("semantic_scholar", semantic_scholar_abstract, task1_semantic_scholar.CONCURRENCY),
+    ("scopus", scopus_abstract, task1_elsevier.CONCURRENCY),
+]
+
+
+def is_missing(value):
+    return not (pd.notna(value) and str(value).strip())
+
+
+async def run_stage(stage, client, inbox, outbox, store, stats):
+    """
+    Pull (indice, title) rows from `inbox` with `concurrency` workers.
+    Hits are journaled with the stage's name as source; misses go to `outbox`.
+    """
+    name, fetch, concurrency = stage
+
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                # put it back so the sibling workers stop as well
+                await inbox.put(DONE)
+                return
+            indice, title = item
+            try:
+                abstract = await fetch(client, title)
+            except Exception as e:
+                print(f"[{name}] {indice}: error {e!r}")
+                abstract = None
+            if abstract:
+                print(f"[{name}] {indice}: abstract found")
+                store.record(indice, abstract=abstract, source=name)
+                stats[name] += 1
+            else:
+                await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await outbox.put(DONE)
+
+
+async def enrich(rows, stages, store):
+    """
+    Run `rows` through the stages as a pipeline: every stage works on its own
+    queue at the same time, and only its misses flow on to the next one.
+    Returns hits per source and the rows no stage could fill.
+    """
+    queues = [asyncio.Queue() for _ in range(len(stages) + 1)]
+    stats = {name: 0 for name, _, _ in stages}
+
+    for row in rows:
+        queues[0].put_nowait(row)
+    queues[0].put_nowait(DONE)
+
+    async with AsyncHttpClient(cache=ResponseCache()) as client:
+        await asyncio.gather(*(
+            run_stage(stage, client, queues[i], queues[i + 1], store, stats)
+            for i, stage in enumerate(stages)
+        ))
+
+    misses = []
+    while True:
+        item = queues[-1].get_nowait()
+        if item is DONE:
+            break
+        misses.append(item)
+    return stats, misses
+
+
+async def main():
+    df = read_dataset(DATASET)
+
+    store = CheckpointStore("enrich")
+    store.apply(df)
+    done = set() if RETRY_MISSES else store.done()
+
+    rows = [(df.at[i, "indice"], str(df.at[i, "title"])) for i in df.index
+            if is_missing(df.at[i, "abstract"]) and str(df.at[i, "indice"]) not in done]
+    print(f"Rows to enrich: {len(rows)}")
+
+    stages = list(STAGES)
+    scopus_key = os.environ.get("SCOPUS_API_KEY") or task1_elsevier.API_KEY
+    if scopus_key:
+        task1_elsevier.headers["X-ELS-APIKey"] = scopus_key
+    else:
+        print("No SCOPUS_API_KEY set: skipping the Scopus stage.")
+        stages = [s for s in stages if s[0] != "scopus"]
+
+    start = time.monotonic()
+    stats, misses = await enrich(rows, stages, store)
+    for indice, _ in misses:
+        store.record(indice, abstract=None, source=None)
+
+    store.apply(df)
+    store.close()
+    path = write_dataset(df, DATASET)
+
+    print(f"\nDone in {time.monotonic() - start:.1f}s")
+    for name, hits in stats.items():
+        print(f"  {name}: {hits}")
+    print(f"  still missing: {len(misses)}")
+    print("Results saved to", path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+import io
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+
+EUTILS_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+ESEARCH_URL = f"{EUTILS_BASE}/esearch.fcgi"
+EFETCH_URL = f"{EUTILS_BASE}/efetch.fcgi"
+
+# NCBI accepts a few hundred ids per POST without complaining
+EFETCH_BATCH_SIZE = 200
+# 3 requests/second without an API key
+NCBI_SLEEP = 0.34
+# PubMed serves only the first 10,000 records of a search, history server included
+HISTORY_LIMIT = 10000
+
+
+# ---------- XML parsing ----------
+def element_text(elem):
+    """Full text of an element, including text inside inline tags (<i>, <sup>, ...)."""
+    if elem is None:
+        return ""
+    return "".join(elem.itertext()).strip()
+
+
+def parse_pubmed_article(article, structured=False):
+    """
+    Extract PMID, title, abstract, journal and publication year from a <PubmedArticle> element.
+    With structured=True, sections of a structured abstract keep their label
+    ("BACKGROUND: ... METHODS: ...").
+    """
+    pmid = article.findtext("MedlineCitation/PMID") or ""
+    title = element_text(article.find(".//ArticleTitle"))
+    journal = element_text(article.find(".//Journal/Title"))
+    # PubDate has either a Year or a free-form MedlineDate ("1998 Dec-1999 Jan")
+    pub_date = article.find(".//JournalIssue/PubDate")
+    year = ""
+    if pub_date is not None:
+        year = (pub_date.findtext("Year") or pub_date.findtext("MedlineDate") or "").strip()[:4]
+
+    parts = []
+    for section in article.findall(".//Abstract/AbstractText"):
+        text = element_text(section)
+        label = section.get("Label") if structured else None
+        if text:
+            parts.append(f"{label}: {text}" if label else text)
+    abstract = " ".join(parts).strip()
+
+    return {"Title": title, "PMID": pmid.strip(), "Abstract": abstract, "Journal": journal,
+            "Year": int(year) if year.isdigit() else None}
+
+
+def iter_pubmed_articles(source, structured=False):
+    """
+    Stream records out of a PubmedArticleSet (file path or file-like object).
+
+    Uses iterparse and clears the root after each article, so memory stays flat
+    no matter how many records the document holds.
+    """
+    context = ET.iterparse(source, events=("start", "end"))
+    root = None
+    for event, elem in context:
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == "PubmedArticle":
+            yield parse_pubmed_article(elem, structured)
+            root.clear()
+        elif elem.tag == "PubmedBookArticle":
+            root.clear()
+
+
+# ---------- EFetch ----------
+def efetch_records(pmids, session=None):
+    """
+    Fetch all `pmids` with a single EFetch POST and yield one record per article.
+
+    The response body is parsed while it is downloaded, so it never sits in
+    memory as a whole.
+    """
+    session = session or requests.Session()
+    data = {
+        "db": "pubmed",
+        "id": ",".join(str(p) for p in pmids),
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    with session.post(EFETCH_URL, data=data, timeout=60, stream=True) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        yield from iter_pubmed_articles(resp.raw)
+
+
+def efetch_abstracts(pmids, batch_size=EFETCH_BATCH_SIZE, session=None):
+    """
+    Fetch PubMed records in batches of `batch_size` PMIDs per POST and yield only
+    the ones with a non-empty abstract.
+    """
+    session = session or requests.Session()
+    pmids = [str(p) for p in pmids]
+
+    for start in range(0, len(pmids), batch_size):
+        batch = pmids[start:start + batch_size]
+        try:
+            for record in efetch_records(batch, session=session):
+                if record["Abstract"]:
+                    yield record
+        except requests.RequestException as e:
+            print(f"Warning: failed to fetch PMIDs {batch[0]}..{batch[-1]}: {e}")
+        except ET.ParseError:
+            print(f"Warning: failed to parse XML for PMIDs {batch[0]}..{batch[-1]}")
+
+        time.sleep(NCBI_SLEEP)
+
+
+# ---------- asyncio variants (see http_client.AsyncHttpClient) ----------
+async def esearch_ids_async(client, term, retmax=20):
+    """Async ESearch through the shared rate-limited client."""
+    params = {"db": "pubmed", "term": term, "retmode": "json", "retmax": retmax}
+    data = await client.get_json(ESEARCH_URL, params=params)
+    if not data:
+        return []
+    return data.get("esearchresult", {}).get("idlist", [])
+
+
+async def efetch_records_async(client, pmids):
+    """Async EFetch of all `pmids` in one POST; returns the list of parsed records."""
+    data = {
+        "db": "pubmed",
+        "id": ",".join(str(p) for p in pmids),
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    resp = await client.post(EFETCH_URL, data=data)
+    if resp is None or not resp.ok:
+        return []
+    try:
+        return list(iter_pubmed_articles(io.BytesIO(resp.text.encode("utf-8"))))
+    except ET.ParseError:
+        return []
+
+
+async def esearch_history_async(client, term, mindate=None, maxdate=None, datetype="edat"):
+    """
+    Async ESearch with usehistory=y: the result set stays on NCBI's history server
+    and is paged with efetch_history_async. mindate/maxdate (YYYY/MM/DD) restrict
+    the search on `datetype`. Returns {"count", "webenv", "query_key"}, or None.
+    """
+    params = {"db": "pubmed", "term": term, "retmode": "json", "retmax": 0, "usehistory": "y"}
+    if mindate or maxdate:
+        params.update(datetype=datetype, mindate=mindate or maxdate, maxdate=maxdate or mindate)
+    data = await client.get_json(ESEARCH_URL, params=params)
+    result = (data or {}).get("esearchresult", {})
+    if "count" not in result:
+        return None
+    return {"count": int(result["count"]), "webenv": result.get("webenv"), "query_key": result.get("querykey")}
+
+
+async def efetch_history_async(client, webenv, query_key, retstart, retmax=EFETCH_BATCH_SIZE):
+    """
+    Async EFetch of records retstart..retstart+retmax of a history-server search.
+    Returns the parsed records, or None when the page failed (an expired WebEnv
+    comes back as a 200 with an error document, not as an empty page).
+    """
+    params = {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": retstart,
+        "retmax": retmax,
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    resp = await client.get(EFETCH_URL, params=params)
+    if resp is None or not resp.ok or "<PubmedArticleSet" not in resp.text:
+        return None
+    try:
+        return list(iter_pubmed_articles(io.BytesIO(resp.text.encode("utf-8"))))
+    except ET.ParseError:
+        return None
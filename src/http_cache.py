@@ -0,0 +1,133 @@
+import hashlib
+import os
+import sqlite3
+import time
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
+
+from dataset import DATA_DIR
+
+CACHE_PATH = DATA_DIR / "http_cache.sqlite"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+DAY = 24 * 3600
+# How long a cached response stays valid, per API host
+HOST_TTLS = {
+    "eutils.ncbi.nlm.nih.gov": 30 * DAY,
+    "www.ebi.ac.uk": 7 * DAY,
+    "api.crossref.org": 30 * DAY,
+    "api.openalex.org": 30 * DAY,
+    "api.semanticscholar.org": 30 * DAY,
+    "api.elsevier.com": 30 * DAY,
+}
+DEFAULT_TTL = 7 * DAY
+
+# 404 is cached too: "no such DOI" is as stable as a hit
+CACHEABLE_STATUS = {200, 404}
+
+# HTTP_CACHE_OFFLINE=1 serves only cached responses and never touches the network
+OFFLINE = os.environ.get("HTTP_CACHE_OFFLINE", "") == "1"
+
+
+def normalize_url(url, params=None):
+    """Lower-case scheme/host, drop the fragment and merge + sort query parameters."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(str(k), str(v)) for k, v in params.items()]
+    netloc = parts.netloc.lower()
+    for default_port in (":80", ":443"):
+        if netloc.endswith(default_port):
+            netloc = netloc[:-len(default_port)]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or "/",
+                       urlencode(sorted(query)), ""))
+
+
+class ResponseCache:
+    """
+    SQLite-backed HTTP response cache keyed by method + normalized URL + body.
+
+    Entries expire after the TTL of their host, and the least recently used
+    ones are evicted once the stored bodies exceed `max_bytes`.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, ttls=None, offline=OFFLINE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(HOST_TTLS, **(ttls or {}))
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                host TEXT,
+                status INTEGER,
+                body TEXT,
+                size INTEGER,
+                created REAL,
+                accessed REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(method, url, params=None, data=None):
+        body = urlencode(sorted(data.items())) if isinstance(data, dict) else (data or "")
+        raw = f"{method.upper()} {normalize_url(url, params)} {body}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def ttl(self, url):
+        return self.ttls.get(urlsplit(url).hostname or "", DEFAULT_TTL)
+
+    def get(self, key):
+        """Return (status, body, url) for a fresh entry, or None."""
+        row = self._conn.execute(
+            "SELECT status, body, url, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        status, body, url, created = row
+        if not self.offline and time.time() - created > self.ttl(url):
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        self.hits += 1
+        return status, body, url
+
+    def put(self, key, url, status, body):
+        if status not in CACHEABLE_STATUS:
+            return
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, urlsplit(url).hostname or "", status, body, size, now, now))
+        self._conn.commit()
+        self._total_bytes += size - (old[0] if old else 0)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_fraction=0.9):
+        """Drop least recently used entries until the cache is under target_fraction * max_bytes."""
+        target = self.max_bytes * target_fraction
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed")
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
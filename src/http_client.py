@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Requests per second allowed by each API (anonymous / free tier)
+HOST_RATES = {
+    "eutils.ncbi.nlm.nih.gov": 3,       # 10 with an NCBI API key
+    "www.ebi.ac.uk": 10,                # EuropePMC
+    "api.crossref.org": 5,              # public pool
+    "api.openalex.org": 10,
+    "api.semanticscholar.org": 1,
+    "api.elsevier.com": 9,              # Scopus search / abstract retrieval
+}
+DEFAULT_RATE = 2
+
+MAX_CONNECTIONS_PER_HOST = 10
+TIMEOUT = 30
+MAX_RETRIES = 3
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HttpResponse:
+    """The bits of a response the fetchers look at, read once while the connection is open."""
+
+    def __init__(self, status, text, url):
+        self.status = status
+        self.text = text
+        self.url = url
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncHttpClient:
+    """
+    Shared aiohttp session with pooled connections per host and a token-bucket
+    limiter per host, so callers can keep many requests in flight and still
+    stay under each API's rate limit.
+
+    An optional http_cache.ResponseCache is consulted before the network;
+    in offline mode a cache miss returns None without sending anything.
+
+    Usage:
+        async with AsyncHttpClient(cache=ResponseCache()) as client:
+            data = await client.get_json(url, params=...)
+    """
+
+    def __init__(self, rates=None, max_connections_per_host=MAX_CONNECTIONS_PER_HOST,
+                 timeout=TIMEOUT, max_retries=MAX_RETRIES, headers=None, cache=None):
+        self.rates = dict(HOST_RATES, **(rates or {}))
+        self.cache = cache
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.headers = headers or {}
+        self._buckets = {}
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit_per_host=self.max_connections_per_host)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=self.headers,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        if self.cache is not None:
+            print(f"HTTP cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+    def _bucket(self, url):
+        host = urlsplit(url).hostname or ""
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rates.get(host, DEFAULT_RATE))
+        return self._buckets[host]
+
+    async def request(self, method, url, params=None, data=None, headers=None):
+        """
+        Rate-limited request with retries on 429/5xx and network errors.
+        Returns an HttpResponse, or None if every attempt failed.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(method, url, params, data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return HttpResponse(*cached)
+            if self.cache.offline:
+                return None
+
+        bucket = self._bucket(url)
+        for attempt in range(self.max_retries):
+            await bucket.acquire()
+            try:
+                async with self._session.request(method, url, params=params, data=data,
+                                                 headers=headers) as resp:
+                    text = await resp.text()
+                    if resp.status in RETRY_STATUS and attempt < self.max_retries - 1:
+                        retry_after = resp.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                        await asyncio.sleep(delay)
+                        continue
+                    if key is not None:
+                        self.cache.put(key, str(resp.url), resp.status, text)
+                    return HttpResponse(resp.status, text, str(resp.url))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries - 1:
+                    print(f"Warning: {method} {url} failed: {e!r}")
+                    return None
+                await asyncio.sleep(2 ** attempt)
+        return None
+
+    async def get(self, url, params=None, headers=None):
+        return await self.request("GET", url, params=params, headers=headers)
+
+    async def post(self, url, data=None, headers=None):
+        return await self.request("POST", url, data=data, headers=headers)
+
+    async def get_json(self, url, params=None, headers=None):
+        """GET and decode JSON; None on any non-2xx status or invalid body."""
+        resp = await self.get(url, params=params, headers=headers)
+        if resp is None or not resp.ok:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+
+async def map_concurrent(func, items, concurrency=20):
+    """
+    Run `await func(item)` for every item with at most `concurrency` calls in
+    flight, yielding (item, result) pairs as they complete. A call that raises
+    yields None as its result.
+    """
+    items = iter(items)
+    pending = set()
+
+    async def run(item):
+        try:
+            return item, await func(item)
+        except Exception as e:
+            print(f"Warning: task failed for {item!r}: {e!r}")
+            return item, None
+
+    def schedule():
+        for item in items:
+            pending.add(asyncio.ensure_future(run(item)))
+            return
+
+    for _ in range(concurrency):
+        schedule()
+
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            pending.discard(task)
+            schedule()
+            yield task.result()
@@ -0,0 +1,208 @@
+"""
+MinHash/LSH near-duplicate search of a corpus against a reference set (e.g. the benchmark).
+
+    index = NearDuplicateIndex(threshold=0.5)
+    index.add_many(benchmark_ids, benchmark_abstracts)
+    matches = index.find(master_abstracts)    # [(row, key, jaccard, containment), ...]
+
+Texts are normalized like titles in title_match (HTML unescaped, tags,
+accents and punctuation dropped, case-folded) and cut into word shingles. Every text gets a MinHash signature; the signature is split into
+bands and only reference texts sharing a whole band with a document are
+candidates. The candidates' shingle-set Jaccard is then computed exactly, so
+the LSH step can only miss pairs, never report false ones.
+
+Jaccard punishes length differences: a two-sentence snippet of an abstract
+(e.g. a Google Scholar result) has a low Jaccard with it although every
+shingle is shared. Pairs are therefore also matched on containment,
+|A & B| / min(|A|, |B|), with its own threshold. A contained pair down to
+MIN_LENGTH_RATIO can have a Jaccard far below the threshold, so a second,
+less selective banding of the same signatures finds its candidates. Only the
+reference side is kept in memory and each document costs one signature and a
+few dict lookups, so the corpus can be streamed and the search is linear in
+its size.
+"""
+import html
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from title_match import NON_WORD_RE, TAG_RE
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_CONTAINMENT = 0.8
+# containment is searched down to this length ratio (short side / long side)
+MIN_LENGTH_RATIO = 0.1
+# a short side with fewer shingles is too short to be called a copy by containment
+MIN_CONTAINMENT_SHINGLES = 8
+# a pair at exactly the threshold must become a candidate with at least this probability
+CANDIDATE_RECALL = 0.99
+# largest prime below 2**32: permuted values fit in uint32
+_PRIME = np.uint64(4294967291)
+_SHINGLE_MULT = np.uint64(1000003)
+_COMBINING_RE = re.compile(r"[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+# ---------- Shingles ----------
+def normalize_text(text):
+    """title_match.normalize_title for whole abstracts: accents go through one regex, not a per-character loop."""
+    if not isinstance(text, str):
+        return ""
+    text = TAG_RE.sub(" ", html.unescape(text))
+    text = _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+    return NON_WORD_RE.sub(" ", text.casefold()).strip()
+
+
+class _WordHasher:
+    """crc32 of every word, memoized: abstracts share most of their vocabulary."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def __call__(self, words):
+        cache = self.cache
+        out = np.empty(len(words), dtype=np.uint64)
+        for i, w in enumerate(words):
+            h = cache.get(w)
+            if h is None:
+                h = cache[w] = zlib.crc32(w.encode("utf-8"))
+            out[i] = h
+        return out
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE, hasher=None):
+    """Sorted unique 64-bit hashes of the word `size`-shingles of the normalized text."""
+    words = normalize_text(text).split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    h = (hasher or _WordHasher())(words)
+    size = min(size, len(words))
+    n = len(words) - size + 1
+    shingles = h[:n].copy()
+    with np.errstate(over="ignore"):
+        for j in range(1, size):
+            shingles = shingles * _SHINGLE_MULT + h[j:j + n]
+    return np.unique(shingles)
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sorted unique hash arrays."""
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    inter = len(np.intersect1d(a, b, assume_unique=True))
+    return inter / (len(a) + len(b) - inter)
+
+
+def containment(a, b):
+    """Share of the smaller of two sorted unique hash arrays that is also in the other."""
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    return len(np.intersect1d(a, b, assume_unique=True)) / min(len(a), len(b))
+
+
+def containment_jaccard(containment, ratio):
+    """Lowest Jaccard of a pair with this containment whose sizes are in this ratio (short / long)."""
+    return containment * ratio / (1.0 + ratio - containment * ratio)
+
+
+def lsh_params(threshold, num_perm=NUM_PERM, recall=CANDIDATE_RECALL):
+    """(bands, rows): the most selective banding that still finds a pair at `threshold` with `recall`."""
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1.0 - (1.0 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+# ---------- Index ----------
+class NearDuplicateIndex:
+    """
+    LSH index of reference texts; `find` returns corpus rows within `threshold`
+    Jaccard of one, or containing / contained in one at `containment` or more.
+    containment=None matches on Jaccard only.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1,
+                 containment=DEFAULT_CONTAINMENT, min_length_ratio=MIN_LENGTH_RATIO):
+        self.threshold = threshold
+        self.containment = containment
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        # the short-side banding: candidates for pairs matched by containment
+        self.containment_bands, self.containment_rows = (
+            lsh_params(containment_jaccard(containment, min_length_ratio), num_perm) if containment else (0, 0))
+        rng = np.random.default_rng(seed)
+        n = max(self.bands * self.rows, self.containment_bands * self.containment_rows)
+        # a < 2**31 and x < 2**32, so a * x + b never overflows uint64
+        self._a = rng.integers(1, 2 ** 31, size=(n, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, size=(n, 1), dtype=np.uint64)
+        self._hasher = _WordHasher()
+        self._buckets = [{} for _ in range(self.bands)]
+        self._containment_buckets = [{} for _ in range(self.containment_bands)]
+        self.keys = []
+        self.shingles = []
+
+    def signature(self, shingles):
+        if len(shingles) == 0:
+            return None
+        x = shingles % _PRIME
+        return ((self._a * x + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def _band_keys(sig, bands, rows):
+        return [sig[i * rows:(i + 1) * rows].tobytes() for i in range(bands)]
+
+    def _banded(self, sig):
+        """(bucket, band key) pairs of a signature, for both bandings."""
+        yield from zip(self._buckets, self._band_keys(sig, self.bands, self.rows))
+        yield from zip(self._containment_buckets,
+                       self._band_keys(sig, self.containment_bands, self.containment_rows))
+
+    def add(self, key, text):
+        shingles = shingle_hashes(text, self.shingle_size, self._hasher)
+        sig = self.signature(shingles)
+        if sig is None:
+            return
+        ref = len(self.keys)
+        self.keys.append(key)
+        self.shingles.append(shingles)
+        for bucket, band in self._banded(sig):
+            bucket.setdefault(band, []).append(ref)
+
+    def add_many(self, keys, texts):
+        for key, text in zip(keys, texts):
+            self.add(key, text)
+
+    def query(self, text):
+        """
+        [(key, jaccard, containment)] of reference texts at or above the Jaccard
+        threshold or the containment threshold, most similar first.
+        """
+        shingles = shingle_hashes(text, self.shingle_size, self._hasher)
+        sig = self.signature(shingles)
+        if sig is None:
+            return []
+        candidates = set()
+        for bucket, band in self._banded(sig):
+            candidates.update(bucket.get(band, ()))
+        hits = []
+        for ref in candidates:
+            other = self.shingles[ref]
+            score = jaccard(shingles, other)
+            contained = containment(shingles, other)
+            if score >= self.threshold or (
+                    self.containment and contained >= self.containment
+                    and min(len(shingles), len(other)) >= MIN_CONTAINMENT_SHINGLES):
+                hits.append((self.keys[ref], score, contained))
+        return sorted(hits, key=lambda h: (-h[1], -h[2]))
+
+    def find(self, texts):
+        """[(row, key, jaccard, containment)] for every text of `texts` with a near duplicate; row is the position."""
+        matches = []
+        for row, text in enumerate(texts):
+            for key, score, contained in self.query(text):
+                matches.append((row, key, score, contained))
+        return matches
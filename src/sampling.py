@@ -0,0 +1,95 @@
+"""
+Seeded reservoir sampling of table chunks, optionally with per-stratum quotas.
+
+Every row gets a priority from a keyed hash of its id (PMID, or the text when
+there is none) and the seed; a reservoir keeps the k rows with the lowest
+priorities seen so far (a bottom-k sample, a uniform sample without
+replacement). Because the priority depends only on the row and the seed, the
+sample is the same whatever the chunk size or the order of the pool, and
+memory is bounded by k plus one chunk.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def row_priorities(keys, seed):
+    """uint64 priority of every key under `seed`."""
+    salt = str(seed).encode("utf-8")[:16]
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(k).encode("utf-8"), digest_size=8, key=salt).digest(), "big")
+         for k in keys),
+        dtype=np.uint64, count=len(keys))
+
+
+class Reservoir:
+    """The k lowest-priority rows offered so far."""
+
+    def __init__(self, k):
+        self.k = k
+        self.rows = None
+        self.priorities = np.zeros(0, dtype=np.uint64)
+        self.offered = 0
+
+    def offer(self, df, priorities):
+        self.offered += len(df)
+        if self.k <= 0 or not len(df):
+            return
+        if len(self.priorities) >= self.k:
+            # only rows that beat the current k-th priority can get in
+            keep = priorities < self.priorities.max()
+            df, priorities = df[keep], priorities[keep]
+            if not len(df):
+                return
+        rows = df if self.rows is None else pd.concat([self.rows, df], ignore_index=True)
+        priorities = np.concatenate([self.priorities, priorities])
+        if len(priorities) > self.k:
+            best = np.argpartition(priorities, self.k - 1)[:self.k]
+            rows, priorities = rows.iloc[best].reset_index(drop=True), priorities[best]
+        self.rows, self.priorities = rows.reset_index(drop=True), priorities
+
+    def sample(self):
+        """The sampled rows, lowest priority first, with their priority in `_priority`."""
+        if self.rows is None:
+            return pd.DataFrame()
+        order = np.argsort(self.priorities, kind="stable")
+        return self.rows.iloc[order].assign(_priority=self.priorities[order]).reset_index(drop=True)
+
+
+class StratifiedReservoir:
+    """
+    Reservoirs with a fixed quota per stratum, plus a global one of the full
+    size. Strata that end up short are topped up from the global reservoir
+    with rows not already taken, so the sample still has `total` rows when
+    the pool allows it.
+    """
+
+    def __init__(self, quotas, id_column, total=None):
+        self.quotas = {s: int(q) for s, q in quotas.items()}
+        # rows beyond the quotas (total > sum of quotas) come from the global reservoir
+        self.total = max(total or 0, sum(self.quotas.values()))
+        self.id_column = id_column
+        self.strata = {s: Reservoir(q) for s, q in self.quotas.items()}
+        self.overall = Reservoir(self.total)
+
+    def offer(self, df, priorities, strata):
+        # rows without a stratum (NaN) only compete for the global reservoir
+        strata = pd.Series(np.asarray(strata, dtype=object))
+        for stratum, rows in strata.groupby(strata).indices.items():
+            if stratum in self.strata:
+                self.strata[stratum].offer(df.iloc[rows], priorities[rows])
+        self.overall.offer(df, priorities)
+
+    def sample(self):
+        """(sampled rows, {stratum: rows missing from its quota})."""
+        parts = {s: r.sample() for s, r in self.strata.items()}
+        taken = pd.concat(parts.values(), ignore_index=True) if parts else pd.DataFrame()
+        shortfall = {s: self.quotas[s] - len(part) for s, part in parts.items()}
+        missing = self.total - len(taken)
+        if missing > 0:
+            extra = self.overall.sample()
+            if len(taken) and len(extra):
+                extra = extra[~extra[self.id_column].isin(set(taken[self.id_column]))]
+            taken = pd.concat([taken, extra.head(missing)], ignore_index=True)
+        return taken, {s: n for s, n in shortfall.items() if n > 0}
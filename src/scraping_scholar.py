@@ -10,15 +10,16 @@ import time
 import random
 import re
 import numpy as np
-import openpyxl 
 import requests 
 
+from checkpoint import CheckpointStore
+from dataset import dataset_path, read_dataset, write_dataset
+
 # --- Conf ---
-FILE_PATH = '../data/publications_with_all_abstracts.xlsx'
+DATASET = 'publications_with_all_abstracts'
 DELAY_BETWEEN_REQUESTS = 15
 RANDOM_DELAY_MAX = 5 # to add 0 to 5 extra seconds randomly
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-SAVE_FREQUENCY = 1 
 SELENIUM_TIMEOUT = 20 # wait time for Selenium  for an element
 SEARCH_URL_TEMPLATE = "https://scholar.google.com/scholar?hl=en&q={query}"
 
@@ -124,15 +125,15 @@ def search_scholar_selenium(driver, title):
         print(f"    An error occurred during Selenium operation: {e}")
         return None
 
-def save_dataframe(df_to_save, file_path):
-    """Saves the DataFrame to Excel, handling potential errors."""
-    print(f"    Attempting to save progress to {file_path}...")
+def save_dataframe(df_to_save, name):
+    """Saves the DataFrame as dataset `name`, handling potential errors."""
+    print(f"    Attempting to save progress to {dataset_path(name)}...")
     try:
-        df_to_save.to_excel(file_path, index=False, engine='openpyxl')
+        write_dataset(df_to_save, name)
         print(f"    Successfully saved progress.")
         return True
     except PermissionError:
-        print(f"    ERROR: Could not save file '{file_path}'. Is it open in another program?")
+        print(f"    ERROR: Could not save file '{dataset_path(name)}'. Is it open in another program?")
         return False
     except Exception as e:
         print(f"    ERROR: An unexpected error occurred while saving: {e}")
@@ -140,26 +141,25 @@ def save_dataframe(df_to_save, file_path):
 
 # --- Main Script ---
 
-print(f"Reading input file: {FILE_PATH}")
+print(f"Reading input dataset: {DATASET}")
 try:
-    df = pd.read_excel(FILE_PATH, keep_default_na=False, na_values=[''])
-    df['abstract'] = df['abstract'].replace('', np.nan)
-except FileNotFoundError:
-    print(f"Error: Input file '{FILE_PATH}' not found.")
+    # empty abstracts come back as null
+    df = read_dataset(DATASET)
+except FileNotFoundError as e:
+    print(f"Error: {e}")
     exit()
 except Exception as e:
-    print(f"Error reading Excel file: {e}")
+    print(f"Error reading dataset: {e}")
     exit()
 
-if 'title' not in df.columns or 'abstract' not in df.columns:
-    print("Error: The Excel file must contain 'title' and 'abstract' columns.")
-    exit()
+# Abstracts scraped by an interrupted run are in the journal, not in the dataset yet
+store = CheckpointStore("scholar_selenium")
+store.apply(df, key=None)
 
 missing_abstracts_indices = df[df['abstract'].apply(is_abstract_missing)].index.tolist()
 print(f"Found {len(missing_abstracts_indices)} entries with missing abstracts.")
 
 count_updated = 0
-success_since_last_save = 0
 driver = None # Initialize driver outside the loop
 
 if not missing_abstracts_indices:
@@ -198,15 +198,10 @@ else:
             if abstract_result: # Check if it's a non-empty string (not None)
                 df.loc[index, 'abstract'] = abstract_result
                 count_updated += 1
-                success_since_last_save += 1
                 print(f"    ---> Abstract found and updated for index {index}.")
 
-                # Save incrementally
-                if success_since_last_save >= SAVE_FREQUENCY:
-                    if save_dataframe(df, FILE_PATH):
-                        success_since_last_save = 0
-                    else:
-                        print("    Save failed. Will retry on next successful scrape.")
+                # Journal the result; the dataset is written once at the end
+                store.record(index, abstract=abstract_result)
             else:
                 print(f"    Could not find abstract for index {index} via Selenium.")
                 df.loc[index, 'abstract'] = np.nan # Ensure it remains NaN
@@ -217,14 +212,13 @@ else:
         print(f"\n*** An unexpected error occurred in the main loop: {e} ***")
     finally:
         # --- Final Save & Cleanup ---
-        if success_since_last_save > 0:
+        if count_updated > 0:
              print("\nAttempting final save before exiting...")
-             save_dataframe(df, FILE_PATH)
-        elif count_updated > 0:
-             print("\nAttempting final confirmation save before exiting...")
-             save_dataframe(df, FILE_PATH)
+             if not save_dataframe(df, DATASET):
+                 print("    Results are kept in the checkpoint journal and will be applied on the next run.")
         else:
              print("\nNo updates made in this session needing final save.")
+        store.close()
 
         if driver:
             print("Quitting Selenium WebDriver...")
@@ -232,7 +226,7 @@ else:
         print("Script finished.")
 
 # Final check outside the loop in case it finished normally
-if count_updated > 0 and success_since_last_save == 0 and driver is None : 
-    print("\nProcess completed. Final data saved in:", FILE_PATH)
+if count_updated > 0 and driver is None : 
+    print("\nProcess completed. Final data saved in:", dataset_path(DATASET))
 elif count_updated == 0 and driver is None:
      print("\nProcess completed. No new abstracts found or updated.")
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Stable train/validation/test assignment that survives appends to the master dataset.
+
+    assigner = SplitAssigner.load(".")                 # split_assignments.parquet, or the current splits
+    assigner, counts = split_dataset("master_dataset_pulito", output_dir=".", assigner=assigner)
+    assigner.save(".")
+
+Every document is keyed by a hash of its normalized abstract. A document
+that already has a split keeps it: the assignments are stored in
+split_assignments.parquet, and a first run adopts the split files already in
+the output directory. A new document goes to the split its hash points to
+(the hash, read as a number in [0, 1), is compared with the cumulative
+ratios), unless that split already holds its share of the document's label;
+then it goes to the split furthest below its share. Per-label quotas
+therefore stay within one document of the ratios, and appending rows never
+moves an existing one. The only exception is the forced-test rule: a document
+flagged by `forced_test` (e.g. a benchmark near duplicate) goes to test even
+if it was assigned elsewhere before.
+
+The master dataset is read and the splits are written one record batch at
+a time, so memory holds the assignments, not the rows.
+"""
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset import COLUMNS, DATA_DIR, dataset_path, import_legacy, legacy_path, read_dataset, to_arrow
+from near_duplicates import normalize_text
+
+SPLITS = ("train", "validation", "test")
+DEFAULT_RATIOS = {"train": 0.70, "validation": 0.15, "test": 0.15}
+MANIFEST_FILE = "split_assignments.parquet"
+BATCH_SIZE = 10000
+
+MANIFEST_SCHEMA = pa.schema([
+    ("key", pa.binary(16)),
+    ("label", pa.int8()),
+    ("split", pa.string()),
+])
+
+
+def text_key(text):
+    """16-byte content hash of the normalized text: copies differing by whitespace or HTML share it."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+
+def hash_split(key, ratios=DEFAULT_RATIOS):
+    """The split a key falls into when quotas allow it."""
+    u = int.from_bytes(key[:8], "big") / 2 ** 64
+    edge = 0.0
+    for split in SPLITS:
+        edge += ratios[split]
+        if u < edge:
+            return split
+    return SPLITS[-1]
+
+
+def split_name(split):
+    return f"{split}_set"
+
+
+class SplitAssigner:
+    """Assignments key -> split, plus per-label split counts for the quotas."""
+
+    def __init__(self, ratios=DEFAULT_RATIOS, assignments=None):
+        total = sum(ratios[s] for s in SPLITS)
+        self.ratios = {s: ratios[s] / total for s in SPLITS}
+        # key -> (label, split)
+        self.assignments = dict(assignments or {})
+        self.counts = {}
+        for label, split in self.assignments.values():
+            self._count(label)[split] += 1
+        self.seen = set()
+        self.new = self.moved = 0
+        # rows assigned in this pass, label -> {split: rows}; duplicates of a text count once each
+        self.rows = {}
+
+    def _count(self, label):
+        return self.counts.setdefault(label, dict.fromkeys(SPLITS, 0))
+
+    # ---------- Persistence ----------
+    @classmethod
+    def load(cls, directory=".", ratios=DEFAULT_RATIOS):
+        """Saved assignments in `directory`; without them, the split datasets already there (if any)."""
+        directory = Path(directory)
+        path = directory / MANIFEST_FILE
+        assignments = {}
+        if path.exists():
+            table = pq.read_table(path).to_pydict()
+            assignments = {k: (label, split) for k, label, split in zip(table["key"], table["label"], table["split"])}
+        else:
+            for split in SPLITS:
+                name = split_name(split)
+                if not dataset_path(name, directory).exists() and legacy_path(name, directory) is None:
+                    continue
+                df = read_dataset(name, columns=["abstract", "label"], data_dir=directory)
+                for text, label in zip(df["abstract"], df["label"]):
+                    assignments.setdefault(text_key(text), (int(label), split))
+        return cls(ratios, assignments)
+
+    def save(self, directory="."):
+        """Write the assignments of the documents seen in the last pass (removed documents are dropped)."""
+        keys = [k for k in self.assignments if k in self.seen] if self.seen else list(self.assignments)
+        table = pa.table({
+            "key": pa.array(keys, type=pa.binary(16)),
+            "label": pa.array([self.assignments[k][0] for k in keys], type=pa.int8()),
+            "split": pa.array([self.assignments[k][1] for k in keys], type=pa.string()),
+        }, schema=MANIFEST_SCHEMA)
+        path = Path(directory) / MANIFEST_FILE
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        tmp.replace(path)
+
+    # ---------- Assignment ----------
+    def _quota_split(self, key, label):
+        counts = self._count(label)
+        n = sum(counts.values()) + 1
+        preferred = hash_split(key, self.ratios)
+        if counts[preferred] + 1 <= np.ceil(self.ratios[preferred] * n):
+            return preferred
+        return max(SPLITS, key=lambda s: self.ratios[s] * n - counts[s])
+
+    def assign(self, key, label, forced_test=False):
+        """Split of one document; existing documents keep theirs unless forced into test."""
+        label = int(label)
+        self.seen.add(key)
+        previous = self.assignments.get(key)
+        if previous is not None and (not forced_test or previous[1] == "test"):
+            split = previous[1]
+        else:
+            if previous is not None:
+                self._count(previous[0])[previous[1]] -= 1
+                self.moved += 1
+                split = "test"
+            else:
+                self.new += 1
+                split = "test" if forced_test else self._quota_split(key, label)
+            self.assignments[key] = (label, split)
+            self._count(label)[split] += 1
+        self.rows.setdefault(label, dict.fromkeys(SPLITS, 0))[split] += 1
+        return split
+
+
+def split_dataset(name="master_dataset_pulito", data_dir=DATA_DIR, output_dir=".", assigner=None,
+                  forced_test=None, batch_size=BATCH_SIZE):
+    """
+    Stream dataset `name` into <output_dir>/{train,validation,test}_set.parquet.
+    forced_test(df) -> bool array flags rows of a batch that must go to test.
+    Returns (assigner, {split: rows written}).
+    """
+    output_dir = Path(output_dir)
+    assigner = assigner or SplitAssigner.load(output_dir)
+    path = dataset_path(name, data_dir)
+    if not path.exists():
+        import_legacy(name, data_dir)
+
+    writers, tmp_paths = {}, {}
+    written = dict.fromkeys(SPLITS, 0)
+    try:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=COLUMNS):
+            df = batch.to_pandas()
+            forced = np.zeros(len(df), dtype=bool) if forced_test is None else np.asarray(forced_test(df))
+            splits = np.array([assigner.assign(text_key(text), label, f)
+                               for text, label, f in zip(df["abstract"], df["label"], forced)])
+            for split in SPLITS:
+                part = df[splits == split]
+                if not len(part):
+                    continue
+                table = to_arrow(part)
+                if split not in writers:
+                    tmp_paths[split] = dataset_path(split_name(split), output_dir).with_suffix(".parquet.tmp")
+                    writers[split] = pq.ParquetWriter(tmp_paths[split], table.schema, compression="zstd")
+                writers[split].write_table(table)
+                written[split] += len(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    for split in SPLITS:
+        out = dataset_path(split_name(split), output_dir)
+        if split in tmp_paths:
+            tmp_paths[split].replace(out)
+        else:
+            # no rows: still replace the old file so it cannot be read as current
+            pq.write_table(to_arrow(pd.DataFrame(columns=COLUMNS)), out)
+    return assigner, written
+
+
+def print_split_report(assigner, written):
+    print(f"Documents: {assigner.new} newly assigned, {len(assigner.seen) - assigner.new} kept their split, "
+          f"{assigner.moved} moved to test by the forced-test rule")
+    for split in SPLITS:
+        by_label = {label: rows[split] for label, rows in sorted(assigner.rows.items())}
+        print(f"  {split:<11} {written[split]:>7} rows  by label {by_label}")
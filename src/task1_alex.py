@@ -1,95 +1,80 @@
+import asyncio
 import pandas as pd
-import requests
-import time
-import csv
-import os
 
-INPUT_FILE = "../data/abstracts.csv"
-OUTPUT_FILE = "../data/abstracts.csv"
-SLEEP = 0.4
+from checkpoint import CheckpointStore
+from crossref import crossref_doi
+from dataset import read_dataset, write_dataset
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient, map_concurrent
 
-# ---------- Helpers ---------- (if problems with csv formatting)
-def safe_read(path):
-    try:
-        return pd.read_csv(path, sep=",", quotechar='"', escapechar="\\", engine="python")
-    except Exception:
-        return pd.read_csv(path, on_bad_lines="skip")
+DATASET = "abstracts"
+# titles in flight at once; per-API rates are enforced by AsyncHttpClient
+CONCURRENCY = 10
 
-# ---------- Load / resume ----------
-df = safe_read(INPUT_FILE)
+# ---------- API helpers ----------
 
-required = ["indice", "title", "abstract"]
-for c in required:
-    if c not in df.columns:
-        raise ValueError(f"Column missing: {c}")
+def rebuild_inverted_index(inv):
+    """Rebuild abstract text from OpenAlex's abstract_inverted_index."""
+    words = sorted(inv.items(), key=lambda kv: kv[1][0])
+    return " ".join([w for w, _ in words])
 
-start = 0
 
-# ---------- API helpers ----------
-def crossref_doi(title):
-    """Search DOI by title using CrossRef."""
-    url = "https://api.crossref.org/works"
-    params = {"query.title": title, "rows": 1}
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        items = r.json().get("message", {}).get("items", [])
-        if not items:
-            return None
-        return items[0].get("DOI")
-    except Exception:
+async def openalex_abstract(client, doi):
+    """Fetch and reconstruct abstract text from OpenAlex."""
+    data = await client.get_json(f"https://api.openalex.org/works/doi:{doi}")
+    if not data:
         return None
 
+    # Case 1: Plain abstract (rare)
+    if "abstract" in data and data["abstract"]:
+        return data["abstract"]
 
-def openalex_abstract(doi):
-    """Fetch and reconstruct abstract text from OpenAlex."""
-    try:
-        url = f"https://api.openalex.org/works/doi:{doi}"
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-
-        # Case 1: Plain abstract (rare)
-        if "abstract" in data and data["abstract"]:
-            return data["abstract"]
-
-        # Case 2: Tokenized abstract_inverted_index
-        inv = data.get("abstract_inverted_index")
-        if not inv:
-            return None
-
-        # Rebuild text in proper order
-        words = sorted(inv.items(), key=lambda kv: kv[1][0])
-        return " ".join([w for w, _ in words])
-
-    except Exception:
+    # Case 2: Tokenized abstract_inverted_index
+    inv = data.get("abstract_inverted_index")
+    if not inv:
         return None
 
-# ---------- Main loop ----------
-for i in range(start, len(df)):
-    title = str(df.at[i, "title"])
-    if pd.notna(df.at[i, "abstract"]) and df.at[i, "abstract"].strip():
-        continue
+    # Rebuild text in proper order
+    return rebuild_inverted_index(inv)
 
-    print(f"\n{df.at[i, 'indice']} — {title}")
 
+async def fetch_abstract(client, title):
     # Step 1: Get DOI from CrossRef
-    doi = crossref_doi(title)
+    doi = await crossref_doi(client, title)
     print("DOI:", doi)
+    if not doi:
+        return None
+    return await openalex_abstract(client, doi)
 
-    abstract = None
-    if doi:
-        abstract = openalex_abstract(doi)
-
-    # Step 2: Write abstract if found
-    if abstract:
-        print("Abstract found")
-        df.at[i, "abstract"] = abstract
-    else:
-        print("No abstract found")
-
-    # Save progress incrementally
-    df.to_csv(OUTPUT_FILE, index=False, quoting=csv.QUOTE_ALL, escapechar="\\")
-    time.sleep(SLEEP)
-
-print("\n Results saved to", OUTPUT_FILE)
+# ---------- Main loop ----------
+async def main():
+    df = read_dataset(DATASET)
+
+    # results of an interrupted run are in the journal, not in the dataset yet
+    store = CheckpointStore("openalex")
+    store.apply(df)
+    done = store.done()
+
+    missing = [i for i in range(len(df))
+               if not (pd.notna(df.at[i, "abstract"]) and str(df.at[i, "abstract"]).strip())
+               and str(df.at[i, "indice"]) not in done]
+
+    async with AsyncHttpClient(cache=ResponseCache()) as client:
+        async for i, abstract in map_concurrent(
+                lambda i: fetch_abstract(client, str(df.at[i, "title"])), missing, CONCURRENCY):
+            print(f"\n{df.at[i, 'indice']} — {df.at[i, 'title']}")
+
+            # Step 2: Write abstract if found
+            if abstract:
+                print("Abstract found")
+                df.at[i, "abstract"] = abstract
+            else:
+                print("No abstract found")
+            # Save progress incrementally
+            store.record(df.at[i, "indice"], abstract=abstract)
+
+    store.close()
+    print("\n Results saved to", write_dataset(df, DATASET))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,21 @@
+import asyncio
 import pandas as pd
-import time
-import requests
-from difflib import SequenceMatcher
 import json
 import os
 
+from checkpoint import CheckpointStore
+from dataset import read_dataset, write_dataset
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient, map_concurrent
+from title_match import best_match
+
 # ---------------- CONFIGURATION ----------------
 API_KEY = ""   
-INPUT_FILE = "../data/abstracts.csv"
-OUTPUT_FILE = "../data/abstracts.csv"
+DATASET = "abstracts"
 
 
 MAX_RETRIES = 3
-SLEEP_BETWEEN_CALLS = 1.0
+CONCURRENCY = 9
 FUZZY_THRESHOLD = 0.93
 # ------------------------------------------------
 
@@ -22,23 +25,10 @@ headers = {
 }
 
 
-def similar(a, b):
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-
-def scopus_search(title):
+async def scopus_search(client, title):
     url = "https://api.elsevier.com/content/search/scopus"
     params = {"query": f'TITLE("{title}")'}
-
-    for _ in range(MAX_RETRIES):
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=15)
-            if r.status_code == 200:
-                return r.json()
-            time.sleep(2)
-        except:
-            time.sleep(2)
-    return None
+    return await client.get_json(url, params=params, headers=headers)
 
 
 def get_doi_from_results(title, results):
@@ -47,23 +37,10 @@ def get_doi_from_results(title, results):
         if not entries:
             return None
 
-        # Exact match
-        for e in entries:
-            if e.get("dc:title", "").strip().lower() == title.lower():
-                return e.get("prism:doi")
-
-        # Fuzzy
-        best = None
-        best_score = 0
-        for e in entries:
-            t = e.get("dc:title", "").strip()
-            score = similar(title, t)
-            if score > best_score:
-                best_score = score
-                best = e
-
-        if best_score >= FUZZY_THRESHOLD:
-            return best.get("prism:doi")
+        # Exact (normalized) or fuzzy match, all entries scored in one call
+        pos, _ = best_match(title, [e.get("dc:title", "") for e in entries], FUZZY_THRESHOLD)
+        if pos is not None:
+            return entries[pos].get("prism:doi")
 
     except:
         return None
@@ -92,32 +69,19 @@ def extract_abstract(data):
     return None
 
 
-def get_abstract_from_doi(doi):
+async def get_abstract_from_doi(client, doi):
     urls = [
         f"https://api.elsevier.com/content/abstract/doi/{doi}",
         f"https://api.elsevier.com/content/article/doi/{doi}"
     ]
 
+    # retries on 429/5xx are handled by the client
     for url in urls:
-        for _ in range(MAX_RETRIES):
-            try:
-                r = requests.get(url, headers=headers, timeout=15)
-
-                if r.status_code == 200:
-                    try:
-                        data = r.json()
-                    except:
-                        return None
-
-                    abs_text = extract_abstract(data)
-                    if abs_text:
-                        return abs_text
-
-                if r.status_code in [429, 503, 500]:
-                    time.sleep(2)
-
-            except:
-                time.sleep(2)
+        data = await client.get_json(url, headers=headers)
+        if data:
+            abs_text = extract_abstract(data)
+            if abs_text:
+                return abs_text
     return None
 
 def check_API_key(key):
@@ -126,59 +90,67 @@ def check_API_key(key):
     return key
 
 
+async def fetch_abstract(client, title):
+    """Returns (abstract, failure reason)."""
+    results = await scopus_search(client, title)
+    if not results:
+        return None, " Scopus search failed"
 
-# ------------- MAIN FLOW ----------------
+    doi = get_doi_from_results(title, results)
+    if not doi:
+        return None, " DOI not found"
 
-API_KEY = check_API_key(API_KEY)
+    print(f" DOI found: {doi}")
 
-df = pd.read_csv(INPUT_FILE)
+    abstract = await get_abstract_from_doi(client, doi)
+    if not abstract:
+        return None, " Abstract fetch failed"
+    return abstract, None
 
-if not all(c in df.columns for c in ["indice", "title", "abstract"]):
-    raise ValueError("CSV must contain: indice, title, abstract")
 
-start_index = 0
 
-print(f"Resuming at row: {start_index}")
+# ------------- MAIN FLOW ----------------
 
-fail_list = []
+async def main():
+    headers["X-ELS-APIKey"] = check_API_key(API_KEY)
 
-for i in range(start_index, len(df)):
-    row = df.iloc[i]
-    idx = row["indice"]
-    title = str(row["title"]).strip()
+    df = read_dataset(DATASET)
 
-    if pd.notna(row["abstract"]) and len(str(row["abstract"]).strip()) > 5:
-        continue
+    # results of an interrupted run are in the journal, not in the dataset yet
+    store = CheckpointStore("scopus")
+    store.apply(df)
+    done = store.done()
 
-    print(f"\nSearching abstract for indice {idx}: {title}")
+    missing = [i for i in range(len(df))
+               if not (pd.notna(df.iloc[i]["abstract"]) and len(str(df.iloc[i]["abstract"]).strip()) > 5)
+               and str(df.iloc[i]["indice"]) not in done]
 
-    results = scopus_search(title)
-    if not results:
-        print(" Scopus search failed")
-        fail_list.append(idx)
-        continue
+    print(f"Missing abstracts: {len(missing)}")
 
-    doi = get_doi_from_results(title, results)
-    if not doi:
-        print(" DOI not found")
-        fail_list.append(idx)
-        continue
+    fail_list = []
 
-    print(f" DOI found: {doi}")
+    async with AsyncHttpClient(max_retries=MAX_RETRIES, cache=ResponseCache()) as client:
+        async for i, result in map_concurrent(
+                lambda i: fetch_abstract(client, str(df.iloc[i]["title"]).strip()), missing, CONCURRENCY):
+            idx = df.iloc[i]["indice"]
+            print(f"\nSearching abstract for indice {idx}: {str(df.iloc[i]['title']).strip()}")
 
-    abstract = get_abstract_from_doi(doi)
-    if not abstract:
-        print(" Abstract fetch failed")
-        fail_list.append(idx)
-        continue
+            abstract, reason = result if result else (None, " Search failed")
+            store.record(idx, abstract=abstract)
+            if not abstract:
+                print(reason)
+                fail_list.append(idx)
+                continue
 
-    print(" Abstract retrieved!")
+            print(" Abstract retrieved!")
 
-    df.loc[i, "abstract"] = abstract
+            df.loc[i, "abstract"] = abstract
 
-    df.to_csv(OUTPUT_FILE, index=False)
-    time.sleep(SLEEP_BETWEEN_CALLS)
+    store.close()
+    path = write_dataset(df, DATASET)
 
+    print("\ndone.")
+    print(f"Filled file {path}")
 
-print("\ndone.")
-print(f"Filled file {OUTPUT_FILE}")
+if __name__ == "__main__":
+    asyncio.run(main())
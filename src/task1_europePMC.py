@@ -1,45 +1,21 @@
+import asyncio
 import pandas as pd
-import requests
-import time
-import csv
 import re
 
-INPUT_FILE = "../data/abstracts.csv"
-OUTPUT_FILE = "../data/abstracts.csv"
-SLEEP = 2
+from checkpoint import CheckpointStore
+from crossref import crossref_doi
+from dataset import read_dataset, write_dataset
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient, map_concurrent
 
-def safe_read(path):
-    try:
-        return pd.read_csv(path, sep=",", quotechar='"', escapechar="\\", engine="python")
-    except:
-        return pd.read_csv(path, on_bad_lines="skip")
+DATASET = "abstracts"
+# titles in flight at once; per-API rates are enforced by AsyncHttpClient
+CONCURRENCY = 10
 
 def sanitize_title(title):
     return re.sub(r"[\n\r\t]+", " ", str(title)).strip()
 
-df = safe_read(INPUT_FILE)
-required = ["indice", "title", "abstract"]
-for c in required:
-    if c not in df.columns:
-        raise ValueError(f"Missing column: {c}")
-
-start = 0
-
-def crossref_doi(title):
-    url = "https://api.crossref.org/works"
-    params = {"query.title": title, "rows": 1}
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        items = r.json().get("message", {}).get("items", [])
-        if not items:
-            return None
-        return items[0].get("DOI")
-    except Exception as e:
-        print("Error CrossRef:", e)
-        return None
-
-def europepmc_title(title, doi=None):
+async def europepmc_title(client, title, doi=None):
     title = sanitize_title(title)
     url = "https://www.ebi.ac.uk/europepmc/webservices/rest/search"
     
@@ -50,43 +26,51 @@ def europepmc_title(title, doi=None):
     
     for q in queries:
         params = {"query": q, "format": "json", "pageSize": 1, "resulttype": "core"}
-        try:
-            r = requests.get(url, params=params, timeout=15)
-            r.raise_for_status()
-            data = r.json()
-            results = data.get("resultList", {}).get("result", [])
-            if not results:
-                continue
-            item = results[0]
-            abs_text = item.get("abstractText") or item.get("abstract")
-            if abs_text:
-                return abs_text
-        except Exception as e:
-            print(f"EuropePMC errore con query {q}:", e)
+        data = await client.get_json(url, params=params)
+        if not data:
+            print(f"EuropePMC errore con query {q}")
+            continue
+        results = data.get("resultList", {}).get("result", [])
+        if not results:
+            continue
+        item = results[0]
+        abs_text = item.get("abstractText") or item.get("abstract")
+        if abs_text:
+            return abs_text
     return None
 
-for i in range(start, len(df)):
-    title = sanitize_title(df.at[i, "title"])
-    
-    if pd.notna(df.at[i, "abstract"]) and df.at[i, "abstract"].strip():
-        continue
-
-    print(f"\n{df.at[i, 'indice']} — {title}")
-
-    doi = crossref_doi(title)
+async def fetch_abstract(client, title):
+    doi = await crossref_doi(client, title)
     if doi:
         print("DOI found:", doi)
+    return await europepmc_title(client, title, doi)
+
+async def main():
+    df = read_dataset(DATASET)
+
+    # results of an interrupted run are in the journal, not in the dataset yet
+    store = CheckpointStore("europepmc")
+    store.apply(df)
+    done = store.done()
 
-    abstract = europepmc_title(title, doi)
+    missing = [i for i in range(len(df))
+               if not (pd.notna(df.at[i, "abstract"]) and str(df.at[i, "abstract"]).strip())
+               and str(df.at[i, "indice"]) not in done]
 
-    if abstract:
-        print("Abstract found!")
-        df.at[i, "abstract"] = abstract
-    else:
-        print("No abstract")
+    async with AsyncHttpClient(cache=ResponseCache()) as client:
+        async for i, abstract in map_concurrent(
+                lambda i: fetch_abstract(client, sanitize_title(df.at[i, "title"])), missing, CONCURRENCY):
+            print(f"\n{df.at[i, 'indice']} — {sanitize_title(df.at[i, 'title'])}")
 
-    df.to_csv(OUTPUT_FILE, index=False, quoting=csv.QUOTE_ALL, escapechar="\\")
+            if abstract:
+                print("Abstract found!")
+                df.at[i, "abstract"] = abstract
+            else:
+                print("No abstract")
+            store.record(df.at[i, "indice"], abstract=abstract)
 
-    time.sleep(SLEEP)
+    store.close()
+    print("\nFile saved in ", write_dataset(df, DATASET))
 
-print("\nFile saved in ", OUTPUT_FILE)
+if __name__ == "__main__":
+    asyncio.run(main())
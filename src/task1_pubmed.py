@@ -1,9 +1,14 @@
-import pandas as pd
-import requests
-import time
-import xml.etree.ElementTree as ET
-import difflib
-import os
+import asyncio
+
+from checkpoint import CheckpointStore
+from dataset import read_dataset, write_dataset
+from eutils import esearch_ids_async, efetch_records_async
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient, map_concurrent
+from title_match import titles_match
+
+# titles resolved in parallel; NCBI's 3 req/s is enforced by the client
+CONCURRENCY = 10
 
 def format_first_author(authors):
     if not isinstance(authors, str) or not authors.strip():
@@ -12,131 +17,69 @@ def format_first_author(authors):
     first_author_formatted = first_author.replace('.', '').replace('  ', ' ')
     return first_author_formatted
 
-def esearch(term):
-    url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-    params = {"db": "pubmed", "term": term, "retmode": "xml"}
-    response = requests.get(url, params=params)
-    if response.status_code == 200 and response.text.startswith('<?xml'):
-        return response.text
-    return None
-
-def fetch_title_from_pmid(pmid):
-    efetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-    params = {"db": "pubmed", "id": pmid, "retmode": "xml"}
-    response = requests.get(efetch_url, params=params)
-    if response.status_code != 200:
-        return None
-    try:
-        root = ET.fromstring(response.text)
-        title = root.findtext(".//ArticleTitle")
-        return title
-    except ET.ParseError:
-        return None
-
 def is_title_similar(original_title, fetched_title, threshold=0.9):
-    if not (original_title and fetched_title):
-        return False
-    ratio = difflib.SequenceMatcher(None, original_title.lower(), fetched_title.lower()).ratio()
-    return ratio >= threshold
+    return titles_match(original_title, fetched_title, threshold)
 
-def try_pubmed_queries(title, authors=None, year=None):
+async def try_pubmed_queries(client, title, authors=None, year=None):
+    """
+    Resolve a title to its PubMed record.
+
+    Each query costs one ESearch plus one EFetch for all of its candidate PMIDs;
+    the matched record already carries the abstract, so nothing is refetched.
+    """
     queries = [f'"{title}"[Title]']
     if authors and year:
         queries.append(f'"{title}"[Title] OR ({authors}[Author] AND {year}[Date - Publication])')
     queries.append(title)
 
     for q in queries:
-        xml_text = esearch(q)
-        if xml_text:
-            try:
-                root = ET.fromstring(xml_text)
-                id_nodes = root.findall(".//Id")
-                for pmid_node in id_nodes:
-                    pmid = pmid_node.text
-                    fetched_title = fetch_title_from_pmid(pmid)
-                    if is_title_similar(title, fetched_title):
-                        return pmid
-            except ET.ParseError:
-                continue
+        pmids = await esearch_ids_async(client, q)
+        if not pmids:
+            continue
+        for record in await efetch_records_async(client, pmids):
+            if is_title_similar(title, record["Title"]):
+                return record
     return None
 
-def get_abstract_xml(pmid):
-    efetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-    params = {
-        "db": "pubmed",
-        "id": pmid,
-        "retmode": "xml",
-    }
-    response = requests.get(efetch_url, params=params)
-    return response.text if response.status_code == 200 and response.text.startswith('<?xml') else None
-
-def extract_abstract_from_xml(xml_text):
-    if not xml_text:
-        return None
-    try:
-        root = ET.fromstring(xml_text)
-        abstract = root.findtext(".//AbstractText")
-        return abstract.strip() if abstract else None
-    except ET.ParseError:
-        return None
+async def resolve_row(client, row):
+    title = str(row.get("title", "")).strip()
+    authors = format_first_author(row.get("authors", ""))
+    year = str(row.get("year_of_publication", "")).strip()
+    return await try_pubmed_queries(client, title, authors, year)
 
-def main():
-    input_file = "../data/publications.xlsx"
-    output_file = "../data/abstracts.csv"
-    df = pd.read_excel(input_file)
-
-    # Carica indici già processati se il file esiste
-    processed_indices = set()
-    if os.path.exists(output_file):
-        try:
-            df_existing = pd.read_csv(output_file)
-            processed_indices = set(df_existing['abstract'])
-            print(f"Found {len(processed_indices)} already processed articles.")
-        except Exception:
-            pass
-
-    results_batch = []
-    save_interval = 100
-
-    for idx, row in df.iterrows():
-        if idx in processed_indices:
-            continue
+async def main():
+    df = read_dataset("publications", columns=["indice", "title", "authors", "year_of_publication"])
+
+    # Carica indici già processati dal journal
+    store = CheckpointStore("pubmed")
+    processed_indices = store.done()
+    if processed_indices:
+        print(f"Found {len(processed_indices)} already processed articles.")
+
+    todo = [(row["indice"], row) for _, row in df.iterrows() if str(row["indice"]) not in processed_indices]
 
-        title = row.get("title", "").strip()
-        authors = format_first_author(row.get("authors", ""))
-        year = str(row.get("year_of_publication", "")).strip()
-
-        pmid = try_pubmed_queries(title, authors, year)
-        abstract = None
-        if pmid:
-            abstract_xml = get_abstract_xml(pmid)
-            abstract = extract_abstract_from_xml(abstract_xml)
-
-        print(f"Iterazione {idx}")
-
-        results_batch.append({
-            "title": title,
-            "pmid": pmid if pmid else "NA",
-            "abstract": abstract if abstract else "NA",
-            "indice": idx
-        })
-        time.sleep(0.4)
-
-        # Salva ogni 100
-        if len(results_batch) >= save_interval:
-            print(f"Salvo {len(results_batch)} risultati su CSV...")
-            header = not os.path.exists(output_file)
-            pd.DataFrame(results_batch).to_csv(output_file, header=header, index=False)
-            results_batch = []
-
-    # Salva gli ultimi risultati rimasti
-    if results_batch:
-        print(f"Salvo ultimi {len(results_batch)} risultati su CSV...")
-        header = not os.path.exists(output_file)
-        pd.DataFrame(results_batch).to_csv(output_file, header=header, index=False)
+    async with AsyncHttpClient(cache=ResponseCache()) as client:
+        async for (idx, row), record in map_concurrent(
+                lambda item: resolve_row(client, item[1]), todo, CONCURRENCY):
+            pmid = record["PMID"] if record else None
+            abstract = record["Abstract"] if record else None
+
+            print(f"Iterazione {idx}")
+
+            store.record(idx,
+                         title=str(row.get("title", "")).strip(),
+                         pmid=pmid if pmid else "NA",
+                         abstract=abstract if abstract else "NA")
+
+    # Scrive il dataset una sola volta, nell'ordine originale ("NA" diventa null)
+    results = store.to_frame()
+    store.close()
+    results = results.sort_values("indice", key=lambda c: c.astype(int))
+    results["source"] = [None if a == "NA" else "pubmed" for a in results["abstract"]]
+    output_file = write_dataset(results[["indice", "pmid", "title", "abstract", "source"]], "abstracts")
+    print(f"Salvati {len(results)} risultati su {output_file}")
 
     print("Processo completato.")
 
 if __name__ == "__main__":
-    main()
-
+    asyncio.run(main())
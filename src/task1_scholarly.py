@@ -2,13 +2,11 @@ import pandas as pd
 from scholarly import scholarly
 import time
 
-input_file = "../data/abstracts.csv"
-output_file = "../data/abstracts.csv"
+from dataset import read_dataset, write_dataset
 
-df = pd.read_csv(input_file)
+dataset = "abstracts"
 
-if "abstract" not in df.columns:
-    df["abstract"] = ""
+df = read_dataset(dataset)
 
 def get_abstract(title):
     try:
@@ -37,6 +35,5 @@ for i, row in df.iterrows():
 
     time.sleep(3)  
 
-df.to_csv(output_file, index=False)
-print("Done:", output_file)
+print("Done:", write_dataset(df, dataset))
 
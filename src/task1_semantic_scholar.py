@@ -1,38 +1,50 @@
-import requests
-import pandas as pd
-import time
+import asyncio
 
-INPUT = "../data/abstracts.csv"
-OUTPUT = "../data/abstracts.csv"
-# File di input
-df = pd.read_csv(INPUT)
-
-# Filtriamo i titoli con abstract mancante
-missing_df = df[df['abstract'].isna() | (df['abstract'].str.strip() == "")]
-print(f"Totale articoli senza abstract: {len(missing_df)}")
+from checkpoint import CheckpointStore
+from dataset import read_dataset, write_dataset
+from http_cache import ResponseCache
+from http_client import AsyncHttpClient, map_concurrent
 
+DATASET = "abstracts"
+# Semantic Scholar allows ~1 req/s, enforced by AsyncHttpClient
+CONCURRENCY = 4
 
 semantic_scholar_url = "https://api.semanticscholar.org/graph/v1/paper/search"
 
-for idx, row in missing_df.iterrows():
-    title = row['title']
-    print(f"\n Searching Semantic Scholar: {title}")
-
-    abstract_text = None
-    try:
-        s_params = {"query": title, "limit": 1, "fields": "title,abstract"}
-        s_resp = requests.get(semantic_scholar_url, params=s_params, timeout=15)
-        s_data = s_resp.json()
-        papers = s_data.get("data", [])
-        if papers:
-            paper = papers[0]
-            abstract_text = paper.get("abstract")
-    except Exception as e:
-        print("Errore Semantic Scholar:", e)
-
-    if abstract_text:
-        df.at[idx, "abstract"] = abstract_text
-
-    time.sleep(0.5)  
-
-df.to_csv(OUTPUT, index=False)
+async def semantic_scholar_abstract(client, title):
+    s_params = {"query": title, "limit": 1, "fields": "title,abstract"}
+    s_data = await client.get_json(semantic_scholar_url, params=s_params)
+    if not s_data:
+        print("Errore Semantic Scholar:", title[:80])
+        return None
+    papers = s_data.get("data", [])
+    if papers:
+        return papers[0].get("abstract")
+    return None
+
+async def main():
+    # File di input
+    df = read_dataset(DATASET)
+
+    # Filtriamo i titoli con abstract mancante
+    store = CheckpointStore("semantic_scholar")
+    store.apply(df)
+    done = store.done()
+    missing_df = df[(df['abstract'].isna() | (df['abstract'].str.strip() == ""))
+                    & ~df['indice'].astype(str).isin(done)]
+    print(f"Totale articoli senza abstract: {len(missing_df)}")
+
+    async with AsyncHttpClient(cache=ResponseCache()) as client:
+        async for idx, abstract_text in map_concurrent(
+                lambda idx: semantic_scholar_abstract(client, df.at[idx, 'title']),
+                missing_df.index, CONCURRENCY):
+            print(f"\n Searching Semantic Scholar: {df.at[idx, 'title']}")
+            if abstract_text:
+                df.at[idx, "abstract"] = abstract_text
+            store.record(df.at[idx, "indice"], abstract=abstract_text)
+
+    store.close()
+    write_dataset(df, DATASET)
+
+if __name__ == "__main__":
+    asyncio.run(main())
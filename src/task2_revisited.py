@@ -1,142 +1,274 @@
 # python
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import random
+
 import requests
 import pandas as pd
-import random
-import time
-import xml.etree.ElementTree as ET
-from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-esearch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-efetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+from checkpoint import CheckpointStore
+from dataset import DATA_DIR, SCHEMA, dataset_path, normalize, read_dataset, to_arrow, write_dataset
+from eutils import ESEARCH_URL, HISTORY_LIMIT, efetch_abstracts, efetch_history_async, esearch_history_async
+from http_client import AsyncHttpClient, map_concurrent
 
-DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
 
 N_RELEVANT = 1308
+# PMIDs per EFetch POST; 1 reproduces the old one-request-per-PMID behaviour
+EFETCH_BATCH_SIZE = 200
+TERM = "(all[tiab]) NOT (polyphenol[title/abstract] OR polyphenols[title/abstract])"
+NEGATIVE_POOL = "non_relevant_publications"
 
-params = {
-    "db": "pubmed",
-    "term": "(all[tiab]) NOT (polyphenol[title/abstract] OR polyphenols[title/abstract])",
-    "retmode": "json",
-    "retmax": 5000
-}
-
-resp = requests.get(esearch_url, params=params)
-resp.raise_for_status()
-esearch_data = resp.json()
-
-pmid_list = esearch_data.get("esearchresult", {}).get("idlist", [])
-print(f"Found {len(pmid_list)} candidate non-relevant PMIDs.")
-
-if len(pmid_list) < N_RELEVANT:
-    raise ValueError("Not enough non-relevant PMIDs retrieved to reach target of 1308 abstracts.")
+# --- harvest mode (--harvest N) ---
+# records per EFetch page of a history-server search
+HARVEST_PAGE_SIZE = 500
+# EFetch pages in flight; NCBI's 3 req/s is enforced by the client
+CONCURRENCY = 6
+# Entrez dates are searched one day at a time (a day stays under HISTORY_LIMIT records),
+# in a seeded random order, so the pool is spread over the whole range
+HARVEST_MINDATE = datetime.date(1950, 1, 1)
+SEED = 42
+POOL_SCHEMA = SCHEMA.append(pa.field("journal_name", pa.string())).append(
+    pa.field("year_of_publication", pa.int64()))
 
-# shuffle and iterate until we collect N_RELEVANT with non-empty abstract
-random.shuffle(pmid_list)
-results = []
-processed = 0
-kept = 0
 
-for pmid in pmid_list:
-    if kept >= N_RELEVANT:
-        break
-
-    efetch_params = {
+# ---------- Sample mode: one ESearch, N_RELEVANT abstracts ----------
+def sample_pool():
+    params = {
         "db": "pubmed",
-        "id": pmid,
-        "retmode": "xml",
-        "rettype": "abstract"
+        "term": TERM,
+        "retmode": "json",
+        "retmax": 5000
     }
 
-    try:
-        fetch_resp = requests.get(efetch_url, params=efetch_params, timeout=20)
-        fetch_resp.raise_for_status()
-    except Exception as e:
-        print(f"Warning: failed to fetch PMID {pmid}: {e}")
-        time.sleep(0.4)
-        continue
+    resp = requests.get(ESEARCH_URL, params=params)
+    resp.raise_for_status()
+    esearch_data = resp.json()
 
-    try:
-        root = ET.fromstring(fetch_resp.text)
-    except ET.ParseError:
-        print(f"Warning: failed to parse XML for PMID {pmid}")
-        time.sleep(0.4)
-        continue
-
-    article = root.find(".//PubmedArticle")
-    if article is None:
-        processed += 1
-        time.sleep(0.4)
-        continue
-
-    title_el = article.find(".//ArticleTitle")
-    title = title_el.text.strip() if (title_el is not None and title_el.text) else ""
-
-    abstract_elems = article.findall(".//AbstractText")
-    if abstract_elems:
-        abstract_parts = [a.text.strip() for a in abstract_elems if a.text and a.text.strip()]
-        abstract = " ".join(abstract_parts).strip()
-    else:
-        abstract = ""
+    pmid_list = esearch_data.get("esearchresult", {}).get("idlist", [])
+    print(f"Found {len(pmid_list)} candidate non-relevant PMIDs.")
+
+    if len(pmid_list) < N_RELEVANT:
+        raise ValueError("Not enough non-relevant PMIDs retrieved to reach target of 1308 abstracts.")
+
+    # shuffle and iterate until we collect N_RELEVANT with non-empty abstract
+    random.shuffle(pmid_list)
+    results = []
+    kept = 0
 
-    processed += 1
-    if abstract:
-        results.append({"Title": title, "PMID": pmid, "Abstract": abstract})
+    # records come back EFETCH_BATCH_SIZE at a time, already filtered to non-empty abstracts
+    for record in efetch_abstracts(pmid_list, batch_size=EFETCH_BATCH_SIZE):
+        results.append(record)
         kept += 1
         # stampa ogni volta che viene trovato un abstract valido
-        t_snip = title.replace("\n", " ").strip()[:120]
-        a_snip = abstract.replace("\n", " ").strip()[:120]
-        print(f"Found {kept}/{N_RELEVANT} — PMID {pmid} — Title: {t_snip} — Abstract snippet: {a_snip}")
-
-    if processed % 50 == 0 or kept % 100 == 0:
-        print(f"Processed {processed} PMIDs, kept {kept} with non-empty abstract.")
-
-    time.sleep(0.34)
-
-print(f"Finished fetching: processed {processed} PMIDs, kept {kept} abstracts.")
-
-if kept < N_RELEVANT:
-    raise RuntimeError(f"Could not collect {N_RELEVANT} non-empty abstracts (collected {kept}). Try increasing retmax or running again.")
-
-df_nr = pd.DataFrame(results[:N_RELEVANT])
-out_nr_path = DATA_DIR / "non_relevant_publications.xlsx"
-df_nr.to_excel(out_nr_path, index=False)
-print(f"Saved {len(df_nr)} non-relevant publications with abstracts to `{out_nr_path}`.")
-
-# --- Combine with existing publications, keeping only rows with non-empty abstracts ---
-def find_abstract_col(df):
-    for c in df.columns:
-        if c.lower() == "abstract":
-            return c
-    return None
-
-pubs_path = DATA_DIR / "publications_with_all_abstracts.xlsx"
-if pubs_path.exists():
-    df1 = pd.read_excel(pubs_path)
-    col1 = find_abstract_col(df1)
-    if col1 is None:
-        print(f"Warning: `Abstract` column not found in `{pubs_path}`. The file will be ignored in the merge.")
-        df1 = pd.DataFrame(columns=["Abstract"])
+        t_snip = record["Title"].replace("\n", " ").strip()[:120]
+        a_snip = record["Abstract"].replace("\n", " ").strip()[:120]
+        print(f"Found {kept}/{N_RELEVANT} — PMID {record['PMID']} — Title: {t_snip} — Abstract snippet: {a_snip}")
+
+        if kept % 100 == 0:
+            print(f"Kept {kept} PMIDs with non-empty abstract.")
+
+        if kept >= N_RELEVANT:
+            break
+
+    print(f"Finished fetching: kept {kept} abstracts.")
+
+    if kept < N_RELEVANT:
+        raise RuntimeError(f"Could not collect {N_RELEVANT} non-empty abstracts (collected {kept}). Try increasing retmax or running again.")
+
+    # Title/PMID/Abstract become the dataset's title/pmid/abstract columns
+    df_nr = normalize(pd.DataFrame(results[:N_RELEVANT]))
+    df_nr["source"] = "pubmed"
+    df_nr["label"] = 0
+    return write_dataset(df_nr, NEGATIVE_POOL)
+
+
+# ---------- Harvest mode: history-server paging, resumable ----------
+def harvest_days(mindate, maxdate, seed):
+    """Every Entrez date in [mindate, maxdate], in a seeded random order."""
+    days = [mindate + datetime.timedelta(n) for n in range((maxdate - mindate).days + 1)]
+    random.Random(seed).shuffle(days)
+    return days
+
+
+def day_id(day):
+    return f"day:{day:%Y-%m-%d}"
+
+
+def page_id(day, retstart):
+    return f"page:{day:%Y-%m-%d}:{retstart}"
+
+
+def write_part(records, path):
+    """One page's records with an abstract as a Parquet file in the pool schema (atomically)."""
+    df = pd.DataFrame(records, columns=["PMID", "Title", "Abstract", "Journal", "Year"])
+    df["source"] = "pubmed"
+    df["label"] = 0
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(to_arrow(df).cast(POOL_SCHEMA), tmp)
+    tmp.replace(path)
+
+
+def assemble_pool(journal, days, page_size, parts_dir, target):
+    """Write the harvested pages, in plan order, as the negative pool: the first `target` unique PMIDs."""
+    path = dataset_path(NEGATIVE_POOL)
+    tmp = path.with_suffix(".parquet.tmp")
+    seen = set()
+    written = 0
+    with pq.ParquetWriter(tmp, POOL_SCHEMA, compression="zstd") as writer:
+        for day in days:
+            info = journal.get(day_id(day))
+            if info is None:
+                continue
+            for retstart in range(0, info["count"], page_size):
+                page = journal.get(page_id(day, retstart))
+                if written >= target or not page or not page["part"]:
+                    continue
+                df = pq.read_table(parts_dir / page["part"]).to_pandas()
+                df = df[~df["pmid"].isin(seen)].drop_duplicates("pmid").head(target - written)
+                df["indice"] = range(written, written + len(df))
+                seen.update(df["pmid"])
+                written += len(df)
+                writer.write_table(pa.Table.from_pandas(df, schema=POOL_SCHEMA, preserve_index=False))
+    tmp.replace(path)
+    return path, written
+
+
+async def harvest(target, page_size=HARVEST_PAGE_SIZE, seed=SEED, term=TERM):
+    """
+    Harvest `target` abstracts matching `term` into the negative pool.
+
+    Each Entrez date is one ESearch with usehistory=y; its result set is then
+    paged with EFetch through WebEnv/query_key, CONCURRENCY pages in flight.
+    Every page is written to its own Parquet file as soon as it arrives and
+    journaled in the checkpoint store, so a restarted run skips the pages it
+    already has and only searches again the dates with pages left.
+    """
+    # a harvest is identified by its parameters: changing them starts a new one, the target can grow
+    plan = hashlib.blake2b(json.dumps([term, str(HARVEST_MINDATE), seed, page_size]).encode("utf-8"),
+                           digest_size=4).hexdigest()
+    store = CheckpointStore(f"pubmed_harvest_{plan}")
+    parts_dir = DATA_DIR / f"{NEGATIVE_POOL}_harvest_{plan}"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    journal = store.results()
+    if "plan" not in journal:
+        # the date range is frozen on the first run (ending yesterday, a day that no longer grows),
+        # so a resumed harvest pages the same result sets
+        store.record("plan", term=term, maxdate=str(datetime.date.today() - datetime.timedelta(1)))
+        journal = store.results()
+    maxdate = datetime.date.fromisoformat(journal["plan"]["maxdate"])
+    days = harvest_days(HARVEST_MINDATE, maxdate, seed)
+
+    kept = sum(fields["kept"] for key, fields in journal.items() if key.startswith("page:"))
+    if kept:
+        print(f"Resuming harvest {plan}: {kept} abstracts already fetched.")
+    failed = 0
+
+    def missing_pages(day):
+        info = journal[day_id(day)]
+        return [s for s in range(0, info["count"], page_size) if page_id(day, s) not in journal]
+
+    async def open_day(client, day):
+        """(search, retstarts of the pages still missing) for one Entrez date."""
+        if day_id(day) in journal and not missing_pages(day):
+            return None, []
+        date = f"{day:%Y/%m/%d}"
+        search = await esearch_history_async(client, term, mindate=date, maxdate=date)
+        if search is None:
+            print(f"Warning: ESearch failed for {date}; it is retried on the next run.")
+            return None, []
+        if search["count"] > HISTORY_LIMIT:
+            print(f"Warning: {search['count']} records on {date}, only the first {HISTORY_LIMIT} are reachable.")
+        if day_id(day) not in journal:
+            count = min(search["count"], HISTORY_LIMIT)
+            store.record(day_id(day), count=count)
+            journal[day_id(day)] = {"count": count}
+        return search, missing_pages(day)
+
+    async def fetch_page(client, item):
+        day, search, retstart = item
+        return await efetch_history_async(client, search["webenv"], search["query_key"], retstart, page_size)
+
+    async def fetch_days(client, round_days):
+        """Search the dates concurrently, then fetch all their missing pages, CONCURRENCY at a time."""
+        nonlocal kept, failed
+        opened = await asyncio.gather(*(open_day(client, day) for day in round_days))
+        pages = [(day, search, s) for day, (search, todo) in zip(round_days, opened) for s in todo]
+
+        async for (day, search, retstart), records in map_concurrent(
+                lambda item: fetch_page(client, item), pages, CONCURRENCY):
+            if records is None:
+                failed += 1
+                print(f"Warning: EFetch failed for {day} from {retstart}; it is retried on the next run.")
+                continue
+            records = [r for r in records if r["Abstract"]]
+            part = None
+            if records:
+                part = f"{day:%Y-%m-%d}_{retstart}.parquet"
+                write_part(records, parts_dir / part)
+            store.record(page_id(day, retstart), kept=len(records), part=part)
+            journal[page_id(day, retstart)] = {"kept": len(records), "part": part}
+            kept += len(records)
+
+    async with AsyncHttpClient() as client:
+        # pages that failed in an earlier run come first, so the pool keeps its plan order
+        retry = [day for day in days if day_id(day) in journal and missing_pages(day)]
+        for start in range(0, len(retry), CONCURRENCY):
+            await fetch_days(client, retry[start:start + CONCURRENCY])
+
+        position = 0
+        while kept < target and position < len(days):
+            await fetch_days(client, days[position:position + CONCURRENCY])
+            position += CONCURRENCY
+            print(f"Harvested {kept}/{target} abstracts ({position}/{len(days)} dates searched).")
+
+    if failed:
+        print(f"Warning: {failed} pages failed; run again to fetch them.")
+    path, written = assemble_pool(journal, days, page_size, parts_dir, target)
+    store.close()
+    print(f"Harvest {plan}: {written} abstracts written to `{path}` (pages kept in `{parts_dir}`).")
+    return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch non-relevant PubMed abstracts and build all_publications.")
+    parser.add_argument("--harvest", type=int, default=None, metavar="N",
+                        help="page the search through the E-utilities history server until N abstracts "
+                             "(resumable); default: sample N_RELEVANT abstracts from one ESearch")
+    parser.add_argument("--page-size", type=int, default=HARVEST_PAGE_SIZE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.harvest:
+        out_nr_path = asyncio.run(harvest(args.harvest, page_size=args.page_size, seed=args.seed))
     else:
-        df1 = df1.rename(columns={col1: "Abstract"})
-else:
-    print(f"Warning: `{pubs_path}` not found. Combining only fetched non-relevants.")
-    df1 = pd.DataFrame(columns=["Abstract"])
+        out_nr_path = sample_pool()
+    df_nr = read_dataset(NEGATIVE_POOL)
+    print(f"Saved {len(df_nr)} non-relevant publications with abstracts to `{out_nr_path}`.")
 
-# ensure our fetched file has consistent column name
-col_nr = find_abstract_col(df_nr)
-if col_nr and col_nr != "Abstract":
-    df_nr = df_nr.rename(columns={col_nr: "Abstract"})
+    # --- Combine with existing publications, keeping only rows with non-empty abstracts ---
+    try:
+        df1 = read_dataset("publications_with_all_abstracts")
+        df1["label"] = 1
+    except FileNotFoundError as e:
+        print(f"Warning: {e}. Combining only fetched non-relevants.")
+        df1 = normalize(pd.DataFrame())
 
-df1["Abstract"] = df1.get("Abstract", "").fillna("").astype(str)
-df_nr["Abstract"] = df_nr.get("Abstract", "").fillna("").astype(str)
+    # empty or whitespace-only abstracts are already null in both frames
+    combined_df = pd.concat([df1, df_nr], ignore_index=True)
+    combined_df = combined_df[combined_df["abstract"].notna()].reset_index(drop=True)
 
-df1 = df1[df1["Abstract"].str.strip() != ""].copy()
-df_nr = df_nr[df_nr["Abstract"].str.strip() != ""].copy()
+    out_all_path = write_dataset(combined_df, "all_publications")
+    print(f"Saved combined publications with abstracts to `{out_all_path}`. Total rows: {len(combined_df)}.")
 
-combined_df = pd.concat([df1, df_nr], ignore_index=True)
-combined_df = combined_df.reset_index(drop=True)
 
-out_all_path = DATA_DIR / "all_publications.xlsx"
-combined_df.to_excel(out_all_path, index=False)
-print(f"Saved combined publications with abstracts to `{out_all_path}`. Total rows: {len(combined_df)}.")
+if __name__ == "__main__":
+    main()
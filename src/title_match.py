@@ -0,0 +1,200 @@
+import html
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# bigram hash space; collisions only ever raise a score by a hair
+N_FEATURES = 2 ** 20
+DEFAULT_THRESHOLD = 0.9
+
+# shared with near_duplicates.normalize_text
+TAG_RE = re.compile(r"<[^>]+>")
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+# ---------- Normalization ----------
+def normalize_title(title):
+    """Unescape HTML, drop tags and accents, case-fold, turn punctuation into single spaces."""
+    # missing titles (None, NaN from a DataFrame) are empty, never the text "nan"
+    if title is None or (not isinstance(title, str) and pd.isna(title)):
+        return ""
+    text = html.unescape(str(title))
+    text = TAG_RE.sub(" ", text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = NON_WORD_RE.sub(" ", text.casefold())
+    return text.strip()
+
+
+def bigrams(key):
+    """Set of hashed character bigrams of a normalized title (word boundaries included)."""
+    padded = f" {key} "
+    return {zlib.crc32(padded[i:i + 2].encode("utf-8")) % N_FEATURES for i in range(len(padded) - 1)}
+
+
+def bigram_matrix(keys):
+    """Binary CSR matrix (len(keys) x N_FEATURES) of bigram presence."""
+    indptr = [0]
+    indices = []
+    for key in keys:
+        indices.extend(sorted(bigrams(key)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+                             shape=(len(keys), N_FEATURES))
+
+
+# ---------- Fast rejection ----------
+def length_bound(size_a, size_b):
+    """Upper bound of the Dice similarity of two sets given only their sizes."""
+    total = size_a + size_b
+    return 2.0 * np.minimum(size_a, size_b) / np.maximum(total, 1)
+
+
+def quick_reject(key_a, key_b, threshold=DEFAULT_THRESHOLD):
+    """
+    True when two normalized titles cannot reach `threshold` bigram Dice: one is
+    empty, or their bigram sets differ too much in size. A pair that would match
+    is never rejected.
+    """
+    if not key_a or not key_b:
+        return True
+    return length_bound(len(bigrams(key_a)), len(bigrams(key_b))) < threshold
+
+
+# ---------- Similarity kernel ----------
+def similarity_many(title, candidates, threshold=None):
+    """
+    Dice similarity on character bigrams between `title` and every candidate,
+    computed in one sparse matrix-vector product. Returns a float array.
+    With a threshold, candidates rejected by quick_reject score 0.0 without being scored.
+    """
+    key = normalize_title(title)
+    keys = [normalize_title(c) for c in candidates]
+    scores = np.zeros(len(keys))
+    exact = np.array([k == key for k in keys], dtype=bool)
+    if threshold is None:
+        scored = np.flatnonzero(~exact)
+    else:
+        scored = np.array([i for i, k in enumerate(keys) if not exact[i] and not quick_reject(key, k, threshold)],
+                          dtype=np.int64)
+    if len(scored):
+        matrix = bigram_matrix([keys[i] for i in scored])
+        query = bigram_matrix([key])
+        inter = np.asarray((matrix @ query.T).todense()).ravel()
+        sizes = np.asarray(matrix.sum(axis=1)).ravel() + query.sum()
+        scores[scored] = 2.0 * inter / np.maximum(sizes, 1)
+    scores[exact] = 1.0
+    return scores
+
+
+def titles_match(a, b, threshold=DEFAULT_THRESHOLD):
+    """Pairwise check: exact normalized match, cheap rejection, then bigram Dice."""
+    key_a, key_b = normalize_title(a), normalize_title(b)
+    if not key_a or not key_b:
+        return False
+    if key_a == key_b:
+        return True
+    if quick_reject(key_a, key_b, threshold):
+        return False
+    return similarity_many(a, [b])[0] >= threshold
+
+
+def best_match(title, candidates, threshold=DEFAULT_THRESHOLD):
+    """Return (position, score) of the best candidate, or (None, best score) below threshold."""
+    scores = similarity_many(title, candidates, threshold)
+    if len(scores) == 0:
+        return None, 0.0
+    pos = int(np.argmax(scores))
+    if scores[pos] >= threshold:
+        return pos, float(scores[pos])
+    return None, float(scores[pos])
+
+
+# ---------- Index ----------
+class TitleIndex:
+    """
+    In-memory index over many titles: O(1) exact hits on the normalized title,
+    then a bigram Dice search for fuzzy ones.
+
+        index = TitleIndex(df["title"], ids=df["indice"])
+        indice, score = index.match("Some title")
+        pairs = index.join(other_df["title"])
+
+    The index keeps, for every bigram, the titles containing it ordered by
+    bigram-set size. A query reads only the postings of its own bigrams, and
+    only inside the size window where length_bound can reach the threshold. It
+    counts the overlap of every title there in one bincount, so titles that
+    cannot match are never touched and the scores are exact. Below the
+    threshold, match and join both return (None, best score among the titles
+    in the window), 0.0 when there is none.
+    """
+
+    def __init__(self, titles, ids=None):
+        titles = list(titles)
+        self.ids = list(ids) if ids is not None else list(range(len(titles)))
+        self.keys = [normalize_title(t) for t in titles]
+        self.exact = {}
+        for pos, key in enumerate(self.keys):
+            if key:
+                self.exact.setdefault(key, pos)
+        matrix = bigram_matrix(self.keys)
+        self.sizes = np.diff(matrix.indptr)
+
+        # postings sorted by (bigram, set size): one searchsorted finds a bigram's size window
+        self._size_base = int(self.sizes.max(initial=0)) + 2
+        rows = np.repeat(np.arange(len(self.keys), dtype=np.int32), self.sizes)
+        posting_keys = matrix.indices.astype(np.int64) * self._size_base + self.sizes[rows]
+        order = np.argsort(posting_keys, kind="stable")
+        self._posting_keys, self._posting_rows = posting_keys[order], rows[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _best(self, key, threshold):
+        """(position, score) of the best fuzzy match of a normalized key, position None below threshold."""
+        features = np.array(sorted(bigrams(key)), dtype=np.int64)
+        size = len(features)
+        # sizes s with length_bound(size, s) >= threshold
+        low = int(np.ceil(threshold * size / (2.0 - threshold) - 1e-9))
+        high = min(int(np.floor(size * (2.0 - threshold) / threshold + 1e-9)), self._size_base - 1)
+        if low > high:
+            return None, 0.0
+        base = features * self._size_base
+        lo = np.searchsorted(self._posting_keys, base + low, side="left")
+        hi = np.searchsorted(self._posting_keys, base + high, side="right")
+        if not (hi > lo).any():
+            return None, 0.0
+        shared = np.bincount(np.concatenate([self._posting_rows[a:b] for a, b in zip(lo, hi)]),
+                             minlength=len(self))
+        rows = np.flatnonzero(shared)
+        scores = 2.0 * shared[rows] / (size + self.sizes[rows])
+        best = int(np.argmax(scores))
+        if scores[best] >= threshold:
+            return int(rows[best]), float(scores[best])
+        return None, float(scores[best])
+
+    def match(self, title, threshold=DEFAULT_THRESHOLD):
+        """Return (id, score) of the best indexed title, or (None, best score)."""
+        return self.join([title], threshold)[0]
+
+    def join(self, titles, threshold=DEFAULT_THRESHOLD):
+        """
+        Match many titles at once; returns a list of (id or None, score), one per input.
+        Exact hits are resolved through the dict, the rest through the bigram postings.
+        """
+        results = []
+        for title in titles:
+            key = normalize_title(title)
+            if not key or not len(self):
+                results.append((None, 0.0))
+            elif key in self.exact:
+                results.append((self.ids[self.exact[key]], 1.0))
+            else:
+                pos, score = self._best(key, threshold)
+                results.append((None if pos is None else self.ids[pos], score))
+        return results
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# the scripts import their siblings by module name, as when run from src/ or Task4/
+for folder in ("src", "Task4"):
+    sys.path.insert(0, str(ROOT / folder))
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from inference import TableWriter, iter_table
+
+
+def test_parquet_writer_accepts_chunks_with_other_dtypes(tmp_path):
+    # pmid is int64 in the first chunks and float64 once a NaN shows up;
+    # doi is all-null in the first chunk and text later
+    source = tmp_path / "in.csv"
+    source.write_text("pmid,doi,abstract\n101,,a\n102,10.1/a,b\n103,,c\n,10.1/b,d\n")
+    assert pd.read_csv(source, chunksize=1).get_chunk()["pmid"].dtype == "int64"
+
+    out = tmp_path / "out.parquet"
+    writer = TableWriter(out)
+    for chunk in iter_table(source, chunk_size=1):
+        writer.write(chunk)
+    writer.close()
+
+    df = pd.read_parquet(out)
+    assert df["abstract"].tolist() == ["a", "b", "c", "d"]
+    assert df["pmid"].tolist()[:3] == [101, 102, 103]
+    assert pd.isna(df["pmid"].iloc[3])
+    assert df["doi"].tolist()[1::2] == ["10.1/a", "10.1/b"]
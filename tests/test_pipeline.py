@@ -0,0 +1,28 @@
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from pipeline import _DONE, _reader
+
+
+def test_reader_stops_at_the_window(tmp_path):
+    source = tmp_path / "in.csv"
+    pd.DataFrame({"abstract": [f"text {i}" for i in range(10)]}).to_csv(source, index=False)
+    out, stop, window = queue.Queue(), threading.Event(), threading.Semaphore(3)
+    thread = threading.Thread(target=_reader, args=(source, 1, out, stop, 1, window), daemon=True)
+    thread.start()
+
+    time.sleep(0.3)
+    assert out.qsize() == 3
+    # freeing one slot (a written chunk) lets exactly one more through
+    window.release()
+    time.sleep(0.3)
+    assert [out.get_nowait()[0] for _ in range(4)] == [0, 1, 2, 3]
+
+    for _ in range(6):
+        window.release()
+    thread.join(timeout=5)
+    items = [out.get_nowait() for _ in range(out.qsize())]
+    assert [seq for seq, _ in items[:-1]] == list(range(4, 10)) and items[-1] is _DONE
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, ndcg_score, roc_auc_score
+
+from ranking_metrics import bootstrap_ci, precision_at_k, ranking_metrics, top_k
+
+
+def test_tied_scores_follow_sklearn():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n = int(rng.integers(2, 60))
+        y_true = rng.integers(0, 2, n)
+        if y_true.min() == y_true.max():
+            y_true[0] = 1 - y_true[0]
+        # few distinct values, so most scores are tied
+        y_score = rng.integers(0, 4, n) / 4.0
+        metrics = ranking_metrics(y_true, y_score)
+        assert metrics["map"] == pytest.approx(average_precision_score(y_true, y_score))
+        assert metrics["ndcg"] == pytest.approx(ndcg_score([y_true], [y_score]))
+        assert metrics["roc_auc"] == pytest.approx(roc_auc_score(y_true, y_score))
+
+
+def test_cutoff_metrics_rank_ties_by_input_order():
+    y_true = [0, 1, 1, 0]
+    y_score = [0.5, 0.5, 0.5, 0.9]
+    assert top_k(y_score, 2).tolist() == [3, 0]
+    assert precision_at_k(y_true, y_score, 2) == 0.0
+    assert ranking_metrics(y_true, y_score)["mrr"] == pytest.approx(1 / 3)
+
+
+def test_nan_scores_rank_last():
+    scores = [np.nan, 0.2, np.nan, 0.9, 0.1]
+    assert top_k(scores, 3).tolist() == [3, 1, 4]
+    assert top_k(scores, 5).tolist() == [3, 1, 4, 0, 2]
+    metrics = ranking_metrics([1, 0, 0, 1, 0], scores)
+    assert metrics["mrr"] == 1.0
+    assert metrics["map"] == pytest.approx(average_precision_score([1, 0, 0, 1, 0], [-1, 0.2, -1, 0.9, 0.1]))
+
+
+def test_bootstrap_interval_contains_point_estimate():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 200)
+    y_score = y_true * 0.3 + rng.random(200)
+    point = ranking_metrics(y_true, y_score)
+    ci = bootstrap_ci(y_true, y_score, n_rounds=200)
+    for name in ("map", "ndcg", "roc_auc"):
+        assert ci[name][0] <= point[name] <= ci[name][1]
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from dataset import write_dataset
+from stable_split import SplitAssigner, print_split_report, split_dataset
+
+
+def test_report_counts_rows_per_label(tmp_path, capsys):
+    # "b" appears three times: one document, three rows
+    df = pd.DataFrame({
+        "indice": range(6),
+        "abstract": ["a", "b", "b", "b", "c", "d"],
+        "label": [1, 0, 0, 0, 1, 0],
+    })
+    write_dataset(df, "master", data_dir=tmp_path)
+    assigner, written = split_dataset("master", data_dir=tmp_path, output_dir=tmp_path,
+                                      assigner=SplitAssigner())
+
+    assert sum(written.values()) == 6
+    for split in written:
+        assert sum(rows[split] for rows in assigner.rows.values()) == written[split]
+    assert sum(assigner.rows[0].values()) == 4
+    assert sum(assigner.rows[1].values()) == 2
+
+    print_split_report(assigner, written)
+    assert "4 newly assigned" in capsys.readouterr().out
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from title_match import TitleIndex, normalize_title, similarity_many, titles_match
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Polyphenol intake", "Polyphenols intake"),
+    ("Flavonoid intake and mortality", "Flavonoids intake and mortality"),
+    ("Dietary polyphenols and cancer", "Dietary polyphenls and cancer"),
+])
+def test_single_token_differences_match(a, b):
+    assert similarity_many(a, [b])[0] >= 0.9
+    assert titles_match(a, b)
+    assert TitleIndex([b]).match(a)[0] == 0
+
+
+def test_missing_titles_are_empty():
+    assert normalize_title(None) == ""
+    assert normalize_title(float("nan")) == ""
+    assert normalize_title(np.nan) == ""
+    assert not titles_match(np.nan, "nan")
+
+
+def test_empty_keys_never_match():
+    index = TitleIndex(["", "x"])
+    assert index.join(["", None]) == [(None, 0.0), (None, 0.0)]
+    assert index.match("x") == (1, 1.0)
+
+
+def test_match_agrees_with_join():
+    titles = ["Polyphenols intake", "Green tea catechins and weight loss", "Coffee and liver disease",
+              "Coffee and liver diseases", "Cocoa flavanols improve endothelial function"]
+    queries = ["Polyphenol intake", "Green tea catechin and weight loss", "coffee and liver disease",
+               "Cocoa flavanols and blood pressure", "Unrelated title"]
+    index = TitleIndex(titles, ids=[10, 11, 12, 13, 14])
+    assert index.join(queries) == [index.match(q) for q in queries]
+    assert index.match("Coffee and liver disease") == (12, 1.0)
+    assert index.match("Unrelated title")[0] is None
+
+
+def test_index_scores_equal_brute_force():
+    titles = ["Polyphenols intake", "Polyphenol intakes", "Total polyphenol intake", "Polyphenol"]
+    index = TitleIndex(titles)
+    for query in ["Polyphenol intake", "polyphenols intake!", "Polyphenl intake"]:
+        scores = similarity_many(query, titles)
+        pos, score = index.match(query, threshold=0.8)
+        assert score == pytest.approx(scores.max())
+        assert pos == int(np.argmax(scores))